@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import sys
+from timeit import default_timer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from silverchain import core, parser  # noqa: E402
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+def main():
+    print('{:<16} {:>10}'.format('example', 'post_parse'))
+    for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.txt'))):
+        with open(path) as f:
+            grammar = parser.parse(f.read(), 'java')
+        begin = default_timer()
+        core.post_parse(grammar)
+        elapsed = default_timer() - begin
+        name = os.path.basename(path)
+        print('{:<16} {:>10.3f}'.format(name, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from timeit import repeat
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from silverchain import core, parser, tabulator  # noqa: E402
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), '..', 'examples',
+                       'ecmascript.txt')
+
+
+def best(func, number=5):
+    return min(repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    with open(EXAMPLE) as f:
+        grammar = parser.parse(f.read(), 'java')
+    core.post_parse(grammar)
+    dfas = {}
+    table = tabulator.tabulate(grammar, cache=dfas)
+    cells = list(table.cells)
+    states = list(table.states)
+
+    # With cached DFAs, tabulate only builds symbols, states and cells
+    print('{:<24} {:>10}'.format('benchmark', 'seconds'))
+    results = [
+        ('tabulate', 1, lambda: tabulator.tabulate(grammar)),
+        ('tabulate (cached)', 10,
+         lambda: tabulator.tabulate(grammar, cache=dict(dfas))),
+        ('set of cells', 10, lambda: set(cells)),
+        ('set of states', 10, lambda: set(states)),
+        ('groups (rebuilt)', 10, lambda: table.update(()) or table.groups),
+        ('groups (cached)', 10, lambda: table.groups),
+    ]
+    for name, number, func in results:
+        print('{:<24} {:>10.4f}'.format(name, best(func, number)))
+
+    print('{:<24} {:>10}'.format('benchmark', 'count'))
+    for name, objs in (('cells', cells), ('states', states)):
+        print('{:<24} {:>10}'.format(name, len(objs)))
+        print('{:<24} {:>10}'.format('  distinct hashes',
+                                     len({hash(o) for o in objs})))
+
+
+if __name__ == '__main__':
+    main()
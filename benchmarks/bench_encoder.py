@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import sys
+from timeit import default_timer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from silverchain import translator  # noqa: E402
+from silverchain.data import Cell, State, Symbol, Table  # noqa: E402
+from silverchain.encoders import java_encoder  # noqa: E402
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+def synthetic_table(n_syms, n_states):
+    # Each nonterminal is a chain of states with a self-loop on every state,
+    # so that every method is a repeat candidate
+    cells = set()
+    start = Symbol.nonterm('S0')
+    for i in range(n_syms):
+        sym = Symbol.nonterm('S{}'.format(i))
+        states = [State(sym, j, j == 0, j == n_states - 1)
+                  for j in range(n_states)]
+        for j, st in enumerate(states):
+            loop = Symbol.term('a{}'.format(j))
+            cells.add(Cell(st, loop, (st,)))
+            if j + 1 < n_states:
+                step = Symbol.term('b{}'.format(j))
+                cells.add(Cell(st, step, (states[j + 1],)))
+    return Table(start, cells, '')
+
+
+def main():
+    print('{:<16} {:>10} {:>10}'.format('nonterminals', 'cells', 'encode'))
+    for n_syms in (10, 20, 40, 80):
+        table = synthetic_table(n_syms, 10)
+        begin = default_timer()
+        java_encoder.encode(table)
+        elapsed = default_timer() - begin
+        print('{:<16} {:>10} {:>10.3f}'.format(
+            n_syms, len(table.cells), elapsed))
+
+    # Throughput in megabytes of Java per second
+    print('{:<16} {:>10} {:>10}'.format('example', 'MB', 'MB/s'))
+    for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.txt'))):
+        with open(path) as f:
+            table = translator.tabulate(f.read(), 'java')
+        begin = default_timer()
+        size = sum(len(c) for _, chunks in java_encoder.iterencode(table)
+                   for c in chunks)
+        elapsed = default_timer() - begin
+        name = os.path.basename(path)
+        print('{:<16} {:>10.2f} {:>10.1f}'.format(
+            name, size / 1e6, size / 1e6 / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import sys
+from timeit import default_timer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from silverchain import core, graph, parser, tabulator  # noqa: E402
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+def edge_lists(path):
+    with open(path) as f:
+        grammar = parser.parse(f.read(), 'java')
+
+    # Dependency graph between productions, as built by `core.post_parse`
+    deps = [(lhs, tok) for lhs, rhs in grammar.prods.items()
+            for tok in rhs if tok in grammar.prods]
+
+    # Epsilon graphs of the Thompson NFAs, as built by `tabulator._to_dfa`
+    core.post_parse(grammar)
+    epss = []
+    for rhs in grammar.prods.values():
+        trs = tabulator._to_nfa(rhs)[0]
+        epss.append([(s, d) for s, t, d in trs if t.text == ''])
+
+    return [deps] + epss
+
+
+def run(module, edge_lists):
+    begin = default_timer()
+    for edges in edge_lists:
+        g = module.DiGraph(edges)
+        for n in list(g.nodes()):
+            list(module.bfs_edges(g, n))
+            module.descendants(g, n)
+        list(module.strongly_connected_components(g))
+    return default_timer() - begin
+
+
+def main():
+    try:
+        import networkx
+    except ImportError:
+        networkx = None
+
+    print('{:<16} {:>10} {:>10}'.format('example', 'graph', 'networkx'))
+    for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.txt'))):
+        els = edge_lists(path)
+        t1 = run(graph, els)
+        t2 = run(networkx, els) if networkx else float('nan')
+        name = os.path.basename(path)
+        print('{:<16} {:>10.3f} {:>10.3f}'.format(name, t1, t2))
+
+
+if __name__ == '__main__':
+    main()
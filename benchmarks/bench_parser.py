@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import sys
+from timeit import default_timer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from silverchain import parser  # noqa: E402
+
+N_RULES = 5000
+
+
+def generate(n_rules, seed=0):
+    rnd = random.Random(seed)
+    names = ['N' + ''.join(rnd.choice('abcdefgh') for _ in range(6))
+             for _ in range(n_rules)]
+    lines = ['START = {} ;'.format(names[0])]
+    for i, name in enumerate(names):
+        alts = []
+        for _ in range(rnd.randint(1, 3)):
+            elems = []
+            for _ in range(rnd.randint(1, 4)):
+                if i + 1 < n_rules and rnd.random() < 0.5:
+                    elem = rnd.choice(names[i + 1:])
+                else:
+                    elem = '"{}"'.format(rnd.choice(['a', 'b', 'c']))
+                elem += rnd.choice(['', '', '*', '+', '?', '{1,2}'])
+                elems.append(elem)
+            alts.append(' '.join(elems))
+        lines.append('{} -> {} ;'.format(name, ' | '.join(alts)))
+    return '\n'.join(lines)
+
+
+def main():
+    text = generate(N_RULES)
+    backends = [('recursive descent', parser)]
+    try:
+        from silverchain import _pyparser
+        backends.append(('pyparsing', _pyparser))
+    except ImportError:
+        pass
+
+    print('{:<20} {:>10}'.format('backend', 'parse'))
+    for name, backend in backends:
+        begin = default_timer()
+        backend.parse(text, 'java')
+        elapsed = default_timer() - begin
+        print('{:<20} {:>10.3f}'.format(name, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from timeit import default_timer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from silverchain import parser, tabulator  # noqa: E402
+
+ELEM = '( "a" | "b" "c" )'
+BOUNDS = [10, 20, 50, 100, 200]
+
+# Bounded repetitions nested under a star, whose subset construction is
+# sensitive to the shape of the repetition automata
+NESTED = '( "a" ( ( "b" "a" | "a" ){3,5} ){2,5} )*'
+_INNER = ' '.join(['( "b" "a" | "a" )'] * 3 + ['( "b" "a" | "a" )?'] * 2)
+NESTED_UNROLLED = '( "a" {} )*'.format(
+    ' '.join(['( {} )'.format(_INNER)] * 2 + ['( {} )?'.format(_INNER)] * 3))
+
+
+def measure(rhs, algorithm='thompson'):
+    text = 'START = S ; S -> {} ;'.format(rhs)
+    begin = default_timer()
+    grammar = parser.parse(text, 'java')
+    table = tabulator.tabulate(grammar, algorithm=algorithm)
+    return default_timer() - begin, len(table.cells)
+
+
+def main():
+    print('{:>6} {:>8} {:>10} {:>10}'.format('m', 'cells', 'native',
+                                             'unrolled'))
+    for m in BOUNDS:
+        native, n_cells = measure('{}{{1,{}}}'.format(ELEM, m))
+        unrolled, _ = measure(' '.join([ELEM] + [ELEM + '?'] * (m - 1)))
+        print('{:>6} {:>8} {:>10.3f} {:>10.3f}'.format(m, n_cells, native,
+                                                       unrolled))
+
+    print('{:>10} {:>8} {:>10} {:>10}'.format('nested', 'cells', 'native',
+                                              'unrolled'))
+    for algorithm in ('thompson', 'glushkov'):
+        native, n_cells = measure(NESTED, algorithm)
+        unrolled, _ = measure(NESTED_UNROLLED, algorithm)
+        print('{:>10} {:>8} {:>10.3f} {:>10.3f}'.format(
+            algorithm, n_cells, native, unrolled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from timeit import default_timer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from silverchain import core, parser, tabulator  # noqa: E402
+from silverchain.data import Grammar  # noqa: E402
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), '..', 'examples',
+                       'ecmascript.txt')
+
+
+def n_nfa_states(expr):
+    n = 0
+    for tok in expr:
+        if tok.is_alter:
+            n += 2
+        elif tok.is_star:
+            n += 1
+        elif not tok.is_concat:
+            n += 2
+    return n
+
+
+def main():
+    with open(EXAMPLE) as f:
+        grammar = parser.parse(f.read(), 'java')
+    core.post_parse(grammar)
+
+    # Tabulate growing subsets of the (inlined) productions, smallest first,
+    # each about twice as large as the previous one
+    prods = sorted(grammar.prods.items(), key=lambda p: n_nfa_states(p[1]))
+    print('{:>6} {:>10} {:>10}'.format('prods', 'nfa states', 'seconds'))
+    last = 0
+    for k in range(1, len(prods) + 1):
+        n = sum(n_nfa_states(e) for _, e in prods[:k])
+        if n < last * 2 and k < len(prods):
+            continue
+        last = n
+
+        sub = Grammar(prods[0][0], dict(prods[:k]), grammar.tdefs,
+                      grammar.eval)
+        begin = default_timer()
+        tabulator.tabulate(sub)
+        elapsed = default_timer() - begin
+        print('{:>6} {:>10} {:>10.3f}'.format(k, n, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -21,10 +21,10 @@ setup(
     ],
     description='A fluent API generator',
     entry_points={'console_scripts': 'silverchain = silverchain.cli:main'},
-    install_requires=[
-        'networkx==1.11',
-        'pyparsing==2.2.0'
-    ],
+    extras_require={
+        'numpy': ['numpy'],
+        'pyparsing': ['pyparsing==2.2.0']
+    },
     license='MIT',
     long_description=long_description,
     name='silverchain',
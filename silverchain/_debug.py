@@ -2,7 +2,7 @@
 import glob
 import os
 import subprocess
-from networkx import bfs_edges
+from .graph import bfs_edges
 
 
 class Drawer(object):
@@ -38,7 +38,7 @@ class Drawer(object):
         gv += 'digraph G{} {{\n'.format(self._n)
         gv += '  layout=neato;\n'
         gv += self._ranks
-        for s, d in graph.edges_iter():
+        for s, d in graph.edges():
             gv += '  "{}" -> "{}"'.format(s, d)
             if (s, d) == highlight:
                 gv += '[color=red,penwidth=3]'
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from .parser import _lex
+from .tabulator import _constructions
+from .version import __version__
+
+_format = 1
+
+
+class TranslationCache(object):
+    # Entries are JSON files named by the hash of their key. They are written
+    # through atomic renames, so readers never see a partial entry, and an
+    # entry's mtime is the time it was last used.
+    def __init__(self, path, max_size=64 << 20):
+        self._path = path
+        self._max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def path(self):
+        return self._path
+
+    def key(self, text, lang, algorithm):
+        # Grammars that differ only in whitespace and comments share a key
+        if algorithm not in _constructions:
+            raise ValueError('Unknown algorithm: {}'.format(algorithm))
+
+        h = hashlib.sha256()
+        for part in (str(_format), __version__, lang, algorithm):
+            h.update(part.encode('utf-8') + b'\0')
+        for _, tok, _ in _lex(text):
+            h.update(tok.encode('utf-8') + b'\0')
+        return h.hexdigest()
+
+    def get(self, key):
+        fpath = self._entry(key)
+        try:
+            with open(fpath, encoding='utf-8') as f:
+                files = json.load(f)
+            os.utime(fpath)
+        except (OSError, ValueError):
+            return None
+        return files
+
+    def put(self, key, files):
+        for _ in self.put_iter(key, ((n, (c,)) for n, c in files.items())):
+            pass
+
+    def put_iter(self, key, files):
+        # Yields the name and chunks of each of `files` while writing them to
+        # the entry of `key`, so that they are not all held at once. The
+        # entry is stored only if all of them are consumed. Failing to write
+        # it is not an error of the translation.
+        f = self._open_temp()
+        try:
+            sep = '{'
+            for name, chunks in files:
+                content = ''.join(chunks)
+                if f is not None:
+                    try:
+                        f.write(sep + json.dumps(name) + ': ' +
+                                json.dumps(content))
+                    except OSError:
+                        f = _discard(f)
+                sep = ', '
+                yield name, (content,)
+
+            if f is not None:
+                try:
+                    f.write('}' if sep == ', ' else '{}')
+                    f.close()
+                    os.replace(f.name, self._entry(key))
+                    f = None
+                    self._evict()
+                except OSError:
+                    pass
+        finally:
+            if f is not None:
+                _discard(f)
+
+    def _open_temp(self):
+        try:
+            return tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', suffix='.tmp', dir=self._path,
+                delete=False)
+        except OSError:
+            return None
+
+    def _entry(self, key):
+        return os.path.join(self._path, key + '.json')
+
+    def _evict(self):
+        # Least recently used entries are removed first
+        with _lock(os.path.join(self._path, 'lock')):
+            entries = []
+            for name in os.listdir(self._path):
+                if not name.endswith('.json'):
+                    continue
+                fpath = os.path.join(self._path, name)
+                try:
+                    st = os.stat(fpath)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, fpath))
+
+            size = sum(e[1] for e in entries)
+            for _, fsize, fpath in sorted(entries):
+                if size <= self._max_size:
+                    break
+                try:
+                    os.remove(fpath)
+                except OSError:
+                    pass
+                size -= fsize
+
+
+def _discard(f):
+    try:
+        f.close()
+        os.remove(f.name)
+    except OSError:
+        pass
+
+
+@contextmanager
+def _lock(path):
+    # Processes sharing a cache evict one at a time where flock is available
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -2,8 +2,15 @@
 import os
 import sys
 from argparse import Action, ArgumentParser, FileType
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
 from . import encoders, version
 from . import translator
+from .cache import TranslationCache
+from .data import CompactTable
+
+
+_n_writers = 4
 
 
 # Argument Action -------------------------------------------------------------
@@ -28,7 +35,8 @@ _aparser = ArgumentParser(description='Fluent API generator')
 _aparser.add_argument(
     'language',
     choices=encoders.languages,
-    help='output language',
+    help='output languages',
+    nargs='+',
     type=str
 )
 
@@ -41,6 +49,76 @@ _aparser.add_argument(
     type=FileType('r')
 )
 
+_aparser.add_argument(
+    '-j', '--jobs',
+    default=1,
+    dest='jobs',
+    help='number of processes used for tabulation',
+    metavar='N',
+    type=int
+)
+
+_aparser.add_argument(
+    '--max-states',
+    default=None,
+    dest='max_states',
+    help='maximum number of DFA states per nonterminal',
+    metavar='N',
+    type=int
+)
+
+_aparser.add_argument(
+    '--max-cells',
+    default=None,
+    dest='max_cells',
+    help='maximum number of DFA transitions per nonterminal',
+    metavar='N',
+    type=int
+)
+
+_aparser.add_argument(
+    '--timeout',
+    default=None,
+    dest='timeout',
+    help='maximum time for tabulation',
+    metavar='SECONDS',
+    type=float
+)
+
+_aparser.add_argument(
+    '--cache-dir',
+    default=os.path.join(
+        os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+        'silverchain'
+    ),
+    dest='cache_dir',
+    help='directory of cached translations',
+    metavar='DIR'
+)
+
+_aparser.add_argument(
+    '--no-cache',
+    action='store_true',
+    dest='no_cache',
+    help='translate without reading or writing the cache'
+)
+
+_aparser.add_argument(
+    '--emit-table',
+    default=None,
+    dest='emit_table',
+    help='write the tabulated grammar to FILE',
+    metavar='FILE'
+)
+
+_aparser.add_argument(
+    '--from-table',
+    default=None,
+    dest='from_table',
+    help='encode a table written by --emit-table instead of the input',
+    metavar='FILE'
+)
+
 _aparser.add_argument(
     '-o', '--output',
     action=_OutdirAction,
@@ -50,6 +128,13 @@ _aparser.add_argument(
     metavar='DIR'
 )
 
+_aparser.add_argument(
+    '--delete-stale',
+    action='store_true',
+    dest='delete_stale',
+    help='delete output files that the grammar no longer produces'
+)
+
 _aparser.add_argument(
     '-v', '--version',
     action='version',
@@ -60,8 +145,93 @@ _aparser.add_argument(
 # Main ------------------------------------------------------------------------
 def main():
     args = _aparser.parse_args()
-    files = translator.translate(args.input.read(), args.language)
-    for name, content in files.items():
-        fpath = os.path.join(args.output, name)
-        with open(fpath, 'w') as f:
+    langs = list(dict.fromkeys(args.language))
+    if args.emit_table is not None and 1 < len(langs):
+        _aparser.error('--emit-table takes a single language')
+
+    limits = {
+        'max_states': args.max_states,
+        'max_cells': args.max_cells,
+        'timeout': args.timeout
+    }
+
+    # A table is bound to the types of a language, so a loaded table is
+    # encoded as is in each language. Files are streamed to disk as they
+    # are rendered, and written to the cache at the same time.
+    if args.from_table is not None:
+        table = CompactTable.load(args.from_table).to_table()
+        outputs = {}
+        for lang in langs:
+            outputs[lang] = encoders.get_iterencode_func(lang)(table)
+
+    elif args.emit_table is not None:
+        table = translator.tabulate(
+            args.input.read(), langs[0], args.jobs, **limits)
+        with open(args.emit_table, 'wb') as f:
+            CompactTable.from_table(table).save(f)
+        outputs = {langs[0]: encoders.get_iterencode_func(langs[0])(table)}
+
+    else:
+        cache = None
+        if not args.no_cache:
+            cache = TranslationCache(args.cache_dir)
+        outputs = translator.iter_translate(
+            args.input.read(), langs, args.jobs, cache=cache, **limits)
+
+    # Each language gets its own subdirectory if there are several
+    for lang, lang_files in outputs.items():
+        outdir = args.output
+        if 1 < len(langs):
+            outdir = os.path.join(outdir, lang)
+            os.makedirs(outdir, exist_ok=True)
+        _write_files(outdir, lang_files, args.delete_stale)
+
+
+def _write_files(outdir, files, delete_stale):
+    # Files are rendered here and written by a pool of threads. The number
+    # of files waiting for a thread is bounded, so that rendered files do
+    # not pile up in memory.
+    names, futures = set(), []
+    slots = BoundedSemaphore(2 * _n_writers)
+    with ThreadPoolExecutor(_n_writers) as pool:
+        for name, chunks in files:
+            names.add(name)
+            content = ''.join(chunks)
+            slots.acquire()
+            future = pool.submit(_write, os.path.join(outdir, name), content)
+            future.add_done_callback(lambda f: slots.release())
+            futures.append(future)
+    for future in futures:
+        future.result()
+
+    # Only files with the extensions of the generated files are stale
+    if delete_stale:
+        exts = {os.path.splitext(name)[1] for name in names}
+        for name in os.listdir(outdir):
+            fpath = os.path.join(outdir, name)
+            if (name not in names and os.path.splitext(name)[1] in exts and
+                    os.path.isfile(fpath)):
+                os.remove(fpath)
+
+
+def _write(fpath, content):
+    # An unchanged file is not rewritten, so that its mtime is kept. Others
+    # are replaced by a complete file at once.
+    try:
+        with open(fpath) as f:
+            if f.read() == content:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    dname, fname = os.path.split(fpath)
+    tmp = os.path.join(dname, '.{}.{}.tmp'.format(fname, os.getpid()))
+    try:
+        with open(tmp, 'w') as f:
             f.write(content)
+        os.replace(tmp, fpath)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return True
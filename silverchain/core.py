@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
-import sys
-from networkx import DiGraph
-from networkx import bfs_edges, strongly_connected_components as sccs
-from .data import Expr, Token
+from .data import Expr, Node, Token
 from .data import Cell, State, Symbol
+from .graph import DiGraph
+from .graph import bfs_edges, on_cycle
+from .graph import strongly_connected_components as sccs
 
 
 def post_parse(grammar):
@@ -11,21 +11,25 @@ def post_parse(grammar):
     G = DiGraph()
     G.add_nodes_from(grammar.prods)
     for lhs, rhs in grammar.prods.items():
-        for tok in rhs:
+        for tok in rhs.operands():
             if tok in grammar.prods:
                 G.add_edge(lhs, tok)
 
     # DEBUG: from ._debug import Drawer # DEBUG
     # DEBUG: drawer = Drawer(G, grammar.start) # DEBUG
 
+    # Strongly connected components of `G`, kept up to date while inlining,
+    # and whether `nd` is on a cycle without `ns` for `(ns, nd)` in an SCC
+    comps, cycles = {}, {}
+    for c in sccs(G):
+        comps.update((n, c) for n in c)
+
     # Inlining
     for root, _ in list(bfs_edges(G, grammar.start)):
         while True:
             nodes = [d for _, d in bfs_edges(G, root)]
             nodes = [root] + nodes
-            edges = []
-            for n in nodes:
-                edges.extend(G.edges([n]))
+            edges = G.edges(nodes)
             for ns, nd in reversed(edges):
                 # DEBUG: drawer.draw(G, (ns, nd)) # DEBUG
 
@@ -33,24 +37,37 @@ def post_parse(grammar):
                 if G.has_edge(nd, nd):
                     continue
 
-                # Skip if `C` consists of multiple nodes
-                g = G.subgraph(n for n in G.nodes_iter() if n != ns)
-                if len(next((c for c in sccs(g) if nd in c))) != 1:
-                    continue
-
-                # Update grammar
-                expr = []
-                alter = Token.alter()
-                for tok in grammar.prods[ns]:
-                    expr.append(tok)
-                    if tok == nd:
-                        expr.extend(list(grammar.prods[nd]) + [alter])
-                grammar.prods[ns] = Expr(expr)
-
-                # Update G
+                # Skip if `nd` is on a cycle that does not pass `ns`. Such a
+                # cycle lies in the SCC of `nd`, which must then contain `ns`
+                # for the cycle to be broken.
+                comp = comps[nd]
+                if 1 < len(comp):
+                    if ns not in comp:
+                        continue
+                    if (ns, nd) not in cycles:
+                        g = G.view(node_filter=lambda n: n in comp and n != ns)
+                        cycles[ns, nd] = on_cycle(g, nd)
+                    if cycles[ns, nd]:
+                        continue
+
+                # Update grammar. The body of `nd` is shared, not copied.
+                leaf = Node(nd)
+                body = Node(Token.alter(), (leaf, grammar.prods[nd].tree))
+                tree = grammar.prods[ns].tree.substitute(leaf, body)
+                grammar.prods[ns] = Expr.from_tree(tree)
+
+                # Update G. Only paths into `nd` can be lost, so only the SCC
+                # of `nd` can split, and no other SCC gains an inner edge.
                 G.remove_edge(ns, nd)
-                for _, dst in G.edges_iter(nd):
+                for _, dst in G.edges([nd]):
                     G.add_edge(ns, dst)
+                if 1 < len(comp):
+                    g = G.view(node_filter=lambda n: n in comp)
+                    for c in sccs(g):
+                        comps.update((n, c) for n in c)
+                    for n1, n2 in list(cycles):
+                        if n2 in comp:
+                            del cycles[n1, n2]
 
                 # DEBUG: drawer.draw(G) # DEBUG
                 break  # Back to `for ns, nd in ...`
@@ -59,18 +76,13 @@ def post_parse(grammar):
                 # DEBUG: drawer.draw(G) # DEBUG
                 break  # Back to `for root, _ in ...`
 
-    return {nd for _, nd in G.edges_iter()}  # Unexpanded nonterminals
+    return {nd for _, nd in G.edges()}  # Unexpanded nonterminals
 
 
 def post_tabulate(table, unexpanded):
-    # Group cells
-    groups = {}
-    for c in table.cells:
-        groups.setdefault(c.src.sym, set()).add(c)
-
     # Copy cells for unexpanded nonterminals
     copies = {}
-    for sym, cells in groups.items():
+    for sym, cells in table.groups.items():
         if sym not in unexpanded:
             continue
 
@@ -85,27 +97,35 @@ def post_tabulate(table, unexpanded):
             copies[sym].add(Cell(src, c.sym, dst))
 
     for cells in copies.values():
-        table.cells.update(cells)
-
-    # Modify table
+        table.update(cells)
+
+    occupied = table.by_src_sym
+    by_sym = table.by_sym
+    fsts = {}
+    for sym, cells in copies.items():
+        fsts[sym] = sorted(c for c in cells if c.src.idx == 0)
+
+    # Modify table. Added cells go back to the worklist, so that the table
+    # reaches a fixpoint even if an added cell's symbol is also copied. Each
+    # added cell carries the symbols expanded to reach it, and a symbol is not
+    # expanded twice on the way, which bounds the fixpoint for left-recursive
+    # nonterminals. Conflicts are checked against the cells from before the
+    # expansion only.
     adds = set()
-    for cell in table.cells:
-        # Skip if cell's symbol is not related to a copied symbol
-        if cell.sym not in copies:
-            continue
-
-        # Add cells
-        fsts = set(c for c in copies[cell.sym] if c.src.idx == 0)
-        for f in fsts:
-            for c in table.cells:
-                if c.src == cell.src and c.sym == f.sym:
-                    break
-            else:
-                if len(f.dst) == 0:
-                    c = Cell(cell.src, f.sym, cell.dst)
-                    adds.add(c)
-                else:
-                    c = Cell(cell.src, f.sym, f.dst + cell.dst)
-                    adds.add(c)
-
-    table.cells.update(adds)
+    seen = set()
+    work = sorted((c, ()) for sym in copies for c in by_sym.get(sym, ()))
+    while work:
+        cell, path = work.pop()
+        path += (cell.sym,)
+        for f in fsts[cell.sym]:
+            # Skip if the source state already has a cell for the symbol
+            if (cell.src, f.sym) in occupied:
+                continue
+
+            c = Cell(cell.src, f.sym, f.dst + cell.dst)
+            adds.add(c)
+            if c.sym in copies and c.sym not in path and (c, path) not in seen:
+                seen.add((c, path))
+                work.append((c, path))
+
+    table.update(adds)
@@ -1,14 +1,23 @@
 # -*- coding: utf-8 -*-
+import mmap
+import struct
+import sys
+from array import array
 from collections.abc import MutableSequence
-from .errors import InvalidExpression
+from weakref import WeakValueDictionary
+from .errors import FrozenTable, InvalidExpression, InvalidTableFile
 from .errors import InvalidStartSymbol, RuleConflict, UndefinedSymbol
 
 
 class Table(object):
+    # Indexes over the cells are built on first use and dropped when the
+    # table is modified. A frozen table can no longer be modified.
     def __init__(self, start, cells, eval):
         self._start = start
-        self._cells = cells
+        self._cells = set(cells)
         self._eval = eval
+        self._frozen = False
+        self._indexes = {}
 
     @property
     def start(self):
@@ -16,22 +25,75 @@ class Table(object):
 
     @property
     def cells(self):
-        return self._cells
+        if 'cells' not in self._indexes:
+            self._indexes['cells'] = frozenset(self._cells)
+        return self._indexes['cells']
 
     @property
     def groups(self):
-        grps = {}
-        for c in self._cells:
-            grps.setdefault(c.src.sym, set()).add(c)
-        return grps
+        return self._group('groups', lambda c: c.src.sym)
+
+    @property
+    def by_src(self):
+        return self._group('by_src', lambda c: c.src)
+
+    @property
+    def by_sym(self):
+        return self._group('by_sym', lambda c: c.sym)
+
+    @property
+    def by_src_sym(self):
+        return self._group('by_src_sym', lambda c: (c.src, c.sym))
 
     @property
     def states(self):
-        sts = set()
-        for c in self._cells:
-            sts.add(c.src)
-            sts.update(c.dst)
-        return sts
+        if 'states' not in self._indexes:
+            sts = set()
+            for c in self._cells:
+                sts.add(c.src)
+                sts.update(c.dst)
+            self._indexes['states'] = frozenset(sts)
+        return self._indexes['states']
+
+    @property
+    def returns(self):
+        # Ids of the states that cells push to return to, in state order
+        if 'returns' not in self._indexes:
+            sts = {d for c in self._cells for d in c.dst[1:]}
+            ids = {st: i for i, st in enumerate(sorted(sts))}
+            self._indexes['returns'] = ids
+        return self._indexes['returns']
+
+    @property
+    def is_frozen(self):
+        return self._frozen
+
+    def add(self, cell):
+        self.update((cell,))
+
+    def update(self, cells):
+        if self._frozen:
+            raise FrozenTable()
+        self._cells.update(cells)
+        self._indexes = {}
+
+    def discard(self, cell):
+        if self._frozen:
+            raise FrozenTable()
+        self._cells.discard(cell)
+        self._indexes = {}
+
+    def freeze(self):
+        self._frozen = True
+        return self
+
+    def _group(self, name, key):
+        if name not in self._indexes:
+            grps = {}
+            for c in self._cells:
+                grps.setdefault(key(c), set()).add(c)
+            self._indexes[name] = {k: frozenset(v) for k, v in grps.items()}
+        return self._indexes[name]
 
     @property
     def eval(self):
@@ -45,11 +107,265 @@ class Table(object):
         return '\n'.join(lines)
 
 
+# Table files start with a header, followed by sections of a count and
+# int32 items (bytes for the string blob), each padded to 4 bytes
+_file_magic = b'SCTB'
+_file_version = 1
+_file_header = struct.Struct('<4sHH')
+_file_count = struct.Struct('<I')
+_file_arrays = ('_srcs', '_syms', '_dptrs', '_dsts', '_groups', '_rows',
+                '_cols', '_widths', '_bases', '_trans')
+_byteorders = ('little', 'big')
+_int_size = array('i').itemsize
+
+
+def _int_view(buf, swap):
+    if not swap:
+        return buf.cast('i')
+    ints = array('i', buf.tobytes())
+    ints.byteswap()
+    return ints
+
+
+class CompactTable(object):
+    # Symbols and states are interned to their positions in `symbols` and
+    # `states`. Cells are stored in flat arrays, sorted by (src, sym), and
+    # each nonterminal gets a dense (state x symbol) matrix of cell indices.
+    def __init__(self, start, eval, symbols, states, cells):
+        self._set_objects(start, eval, symbols, states)
+
+        self._srcs, self._syms = array('i'), array('i')
+        self._dptrs, self._dsts = array('i', [0]), array('i')
+        for src, sym, dst in cells:
+            self._srcs.append(src)
+            self._syms.append(sym)
+            self._dsts.extend(dst)
+            self._dptrs.append(len(self._dsts))
+
+        gids, sizes = {}, []
+        self._groups, self._rows = array('i'), array('i')
+        for st in states:
+            g = gids.setdefault(st.sym, len(gids))
+            if g == len(sizes):
+                sizes.append(0)
+            self._groups.append(g)
+            self._rows.append(sizes[g])
+            sizes[g] += 1
+
+        n_syms = len(symbols)
+        self._cols = array('i', [-1]) * (len(sizes) * n_syms)
+        self._widths = array('i', [0]) * len(sizes)
+        for src, sym in zip(self._srcs, self._syms):
+            g = self._groups[src]
+            if self._cols[g * n_syms + sym] < 0:
+                self._cols[g * n_syms + sym] = self._widths[g]
+                self._widths[g] += 1
+
+        self._bases = array('i', [0])
+        for g, size in enumerate(sizes):
+            self._bases.append(self._bases[g] + size * self._widths[g])
+        self._trans = array('i', [-1]) * self._bases[-1]
+        for i in reversed(range(len(self._srcs))):
+            self._trans[self._offset(self._srcs[i], self._syms[i])] = i
+
+    @classmethod
+    def from_table(cls, table):
+        symbols = sorted({c.sym for c in table.cells})
+        states = sorted(table.states)
+        symbol_ids = {s: i for i, s in enumerate(symbols)}
+        state_ids = {s: i for i, s in enumerate(states)}
+
+        cells = []
+        for c in sorted(table.cells):
+            dst = tuple(state_ids[d] for d in c.dst)
+            cells.append((state_ids[c.src], symbol_ids[c.sym], dst))
+
+        return cls(table.start, table.eval, symbols, states, cells)
+
+    @classmethod
+    def load(cls, path):
+        # The arrays are views of the mapped file, so cells are only built
+        # when they are looked up
+        with open(path, 'rb') as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise InvalidTableFile(path, 'the file is empty')
+
+        view = memoryview(buf)
+        if len(view) < _file_header.size:
+            raise InvalidTableFile(path, 'the file is truncated')
+        magic, version, order = _file_header.unpack_from(view)
+        if magic != _file_magic:
+            raise InvalidTableFile(path, 'the file is not a table')
+        if version != _file_version:
+            msg = 'version {} is not supported'.format(version)
+            raise InvalidTableFile(path, msg)
+        swap = order != _byteorders.index(sys.byteorder)
+
+        sections, pos = [], _file_header.size
+        for i in range(len(_file_arrays) + 5):
+            if len(view) < pos + _file_count.size:
+                raise InvalidTableFile(path, 'the file is truncated')
+            n, = _file_count.unpack_from(view, pos)
+            pos += _file_count.size
+            size = n if i == 0 else n * _int_size
+            if len(view) < pos + size:
+                raise InvalidTableFile(path, 'the file is truncated')
+            sec = view[pos:pos + size]
+            sections.append(sec if i == 0 else _int_view(sec, swap))
+            pos += -(-size // _int_size) * _int_size
+
+        blob, ptrs, recs, sts, meta = sections[:5]
+        strs = [bytes(blob[ptrs[i]:ptrs[i + 1]]).decode('utf-8')
+                for i in range(len(ptrs) - 1)]
+        syms = []
+        for i in range(0, len(recs), 3):
+            text, category, typ = recs[i:i + 3]
+            typ = None if typ < 0 else strs[typ]
+            syms.append(Symbol(strs[text], category, typ))
+        states = []
+        for i in range(0, len(sts), 4):
+            sym, idx, is_ini, is_fin = sts[i:i + 4]
+            states.append(State(syms[sym], idx, bool(is_ini), bool(is_fin)))
+
+        start, eval, n_syms = meta
+        table = cls.__new__(cls)
+        table._set_objects(syms[start], strs[eval], syms[:n_syms], states)
+        for name, sec in zip(_file_arrays, sections[5:]):
+            setattr(table, name, sec)
+        table._buffer = buf
+        return table
+
+    def save(self, f):
+        # Strings, symbols and states are written as pools of records that
+        # refer to each other by id, followed by the arrays
+        strs, syms, recs = {}, {}, array('i')
+
+        def str_id(text):
+            return -1 if text is None else strs.setdefault(text, len(strs))
+
+        def sym_id(sym):
+            if sym not in syms:
+                syms[sym] = len(syms)
+                recs.extend((str_id(sym.text), sym._category,
+                             str_id(sym.type)))
+            return syms[sym]
+
+        for sym in self._symbols:
+            sym_id(sym)
+        sts = array('i')
+        for st in self._states:
+            sts.extend((sym_id(st.sym), st.idx, st.is_ini, st.is_fin))
+        meta = array('i', (sym_id(self._start), str_id(self._eval),
+                           len(self._symbols)))
+
+        blob, ptrs = bytearray(), array('i', [0])
+        for text in sorted(strs, key=strs.get):
+            blob += text.encode('utf-8')
+            ptrs.append(len(blob))
+
+        order = _byteorders.index(sys.byteorder)
+        f.write(_file_header.pack(_file_magic, _file_version, order))
+        arrays = [getattr(self, name) for name in _file_arrays]
+        for sec in [blob, ptrs, recs, sts, meta] + arrays:
+            data = bytes(sec) if sec is blob else memoryview(sec).tobytes()
+            f.write(_file_count.pack(len(sec)))
+            f.write(data)
+            f.write(b'\0' * (-len(data) % _int_size))
+
+    def to_table(self):
+        cells = set()
+        for i in range(len(self)):
+            src, sym, dst = self.cell(i)
+            src = self._states[src]
+            sym = self._symbols[sym]
+            dst = tuple(self._states[d] for d in dst)
+            cells.add(Cell(src, sym, dst))
+        return Table(self._start, cells, self._eval)
+
+    @property
+    def start(self):
+        return self._start
+
+    @property
+    def eval(self):
+        return self._eval
+
+    @property
+    def symbols(self):
+        return self._symbols
+
+    @property
+    def states(self):
+        return self._states
+
+    def symbol_id(self, sym):
+        return self._symbol_ids[sym]
+
+    def state_id(self, st):
+        return self._state_ids[st]
+
+    def cell(self, i):
+        dst = self._dsts[self._dptrs[i]:self._dptrs[i + 1]]
+        return self._srcs[i], self._syms[i], tuple(dst)
+
+    def find(self, src, sym):
+        offset = self._offset(src, sym)
+        return -1 if offset < 0 else self._trans[offset]
+
+    def find_all(self, srcs, syms):
+        try:
+            import numpy
+        except ImportError:
+            return array('i', (self.find(s, y) for s, y in zip(srcs, syms)))
+
+        def view(a):
+            return numpy.frombuffer(a, dtype='i')
+
+        srcs = numpy.asarray(srcs, dtype=numpy.intp)
+        syms = numpy.asarray(syms, dtype=numpy.intp)
+        groups = view(self._groups)[srcs]
+        cols = view(self._cols)[groups * len(self._symbols) + syms]
+        offsets = (view(self._bases)[groups] +
+                   view(self._rows)[srcs] * view(self._widths)[groups] +
+                   cols)
+        found = cols >= 0
+        result = numpy.full(len(srcs), -1, dtype='i')
+        result[found] = view(self._trans)[offsets[found]]
+        return result
+
+    def next(self, src, sym):
+        i = self.find(src, sym)
+        return None if i < 0 else self.cell(i)[2]
+
+    def _set_objects(self, start, eval, symbols, states):
+        self._start = start
+        self._eval = eval
+        self._symbols = symbols
+        self._states = states
+        self._symbol_ids = {s: i for i, s in enumerate(symbols)}
+        self._state_ids = {s: i for i, s in enumerate(states)}
+
+    def _offset(self, src, sym):
+        g = self._groups[src]
+        col = self._cols[g * len(self._symbols) + sym]
+        if col < 0:
+            return -1
+        return self._bases[g] + self._rows[src] * self._widths[g] + col
+
+    def __len__(self):
+        return len(self._srcs)
+
+
 class Cell(object):
+    __slots__ = ('_src', '_sym', '_dst', '_hash')
+
     def __init__(self, src, sym, dst):
         self._src = src
         self._sym = sym
         self._dst = dst
+        self._hash = hash((src, sym, dst))
 
     @property
     def src(self):
@@ -71,7 +387,7 @@ class Cell(object):
         )
 
     def __hash__(self):
-        return hash(self._src) + hash(self._sym) + hash(self._dst)
+        return self._hash
 
     def __eq__(self, other):
         return (self._src == other._src and
@@ -85,11 +401,14 @@ class Cell(object):
 
 
 class State(object):
+    __slots__ = ('_sym', '_idx', '_is_ini', '_is_fin', '_hash')
+
     def __init__(self, sym, idx, is_ini=False, is_fin=False):
         self._sym = sym
         self._idx = idx
         self._is_ini = is_ini
         self._is_fin = is_fin
+        self._hash = hash((sym, idx, is_ini, is_fin))
 
     @property
     def sym(self):
@@ -115,7 +434,7 @@ class State(object):
         )
 
     def __hash__(self):
-        return hash(self._sym) + hash(self._idx) + self._is_ini + self._is_fin
+        return self._hash
 
     def __eq__(self, other):
         return (self._sym == other._sym and
@@ -130,12 +449,22 @@ class State(object):
 
 
 class Symbol(object):
+    # Symbols are interned, so equal symbols are the same object
+    __slots__ = ('_text', '_category', '_type', '_hash', '__weakref__')
     _TERM, _NONTERM = range(2)
-
-    def __init__(self, text, category, type):
-        self._text = text
-        self._category = category
-        self._type = type
+    _symbols = WeakValueDictionary()
+
+    def __new__(cls, text, category, type):
+        key = text, category, type
+        sym = cls._symbols.get(key)
+        if sym is None:
+            sym = super(Symbol, cls).__new__(cls)
+            sym._text = text
+            sym._category = category
+            sym._type = type
+            sym._hash = hash(key)
+            cls._symbols[key] = sym
+        return sym
 
     @classmethod
     def term(cls, text):
@@ -178,12 +507,13 @@ class Symbol(object):
                 return self._text
 
     def __hash__(self):
-        return hash(self._text) + hash(self._category) + hash(self._type)
+        return self._hash
 
     def __eq__(self, other):
-        return (self._text == other._text and
-                self._category == other._category and
-                self._type == other._type)
+        return self is other
+
+    def __reduce__(self):
+        return Symbol, (self._text, self._category, self._type)
 
     def __lt__(self, other):
         seq1 = self._category, self._text, self._type
@@ -192,11 +522,12 @@ class Symbol(object):
 
 
 class Grammar(object):
-    def __init__(self, start, prods, tdefs, eval):
+    def __init__(self, start, prods, tdefs, eval, langs=None):
         self.start = start
         self._prods = prods
         self._tdefs = tdefs
         self.eval = eval
+        self._langs = langs or {}
 
     @property
     def prods(self):
@@ -206,6 +537,15 @@ class Grammar(object):
     def tdefs(self):
         return self._tdefs
 
+    @property
+    def langs(self):
+        return list(self._langs)
+
+    def bind(self, lang):
+        # The grammar of `lang`, sharing the productions of this grammar
+        tdefs, eval = self._langs[lang]
+        return Grammar(self.start, self._prods, tdefs, eval)
+
     def validate(self):
         if self.start not in self._prods:
             raise InvalidStartSymbol()
@@ -215,7 +555,7 @@ class Grammar(object):
 
         for expr in self._prods.values():
             expr.validate()
-            for tok in expr:
+            for tok in expr.operands():
                 if not tok.is_nonterm:
                     continue
                 if tok in self._prods:
@@ -236,31 +576,75 @@ class Grammar(object):
 
 
 class Expr(MutableSequence):
+    # An expression is either a postfix token list or a shared `Node` tree.
+    # Trees are only expanded into tokens when used as a sequence.
     def __init__(self, tokens):
         self._tokens = [t for t in tokens]
+        self._tree = None
+
+    @classmethod
+    def from_tree(cls, tree):
+        expr = cls(())
+        expr._tokens = None
+        expr._tree = tree
+        return expr
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self.validate()
+            self._tree = Node.from_postfix(self._tokens)
+        return self._tree
+
+    def operands(self):
+        if self._tokens is None:
+            return self._tree.operands()
+        return [t for t in self._tokens if t.is_term or t.is_nonterm]
+
+    def _mutable_tokens(self):
+        if self._tokens is None:
+            self._tokens = list(self._tree.postfix())
+        self._tree = None
+        return self._tokens
 
     def __delitem__(self, i):
-        return self._tokens.__delitem__(i)
+        return self._mutable_tokens().__delitem__(i)
 
     def __getitem__(self, i):
+        if self._tokens is None:
+            self._tokens = list(self._tree.postfix())
         return self._tokens.__getitem__(i)
 
+    def __iter__(self):
+        if self._tokens is None:
+            return self._tree.postfix()
+        return iter(self._tokens)
+
     def __len__(self):
+        if self._tokens is None:
+            return self._tree.size
         return self._tokens.__len__()
 
     def __setitem__(self, i, v):
-        return self._tokens.__setitem__(i, v)
+        return self._mutable_tokens().__setitem__(i, v)
 
     def insert(self, i, v):
-        return self._tokens.insert(i, v)
+        return self._mutable_tokens().insert(i, v)
 
     def validate(self):
+        if self._tokens is None:
+            return  # Trees are well-formed by construction
+
         n_stack = 0
         for tok in self._tokens:
             if tok.is_term or tok.is_nonterm:
                 n_stack += 1
             elif tok.is_concat or tok.is_alter:
+                if n_stack < 2:
+                    raise InvalidExpression(self)
                 n_stack -= 1
+            elif n_stack < 1:
+                raise InvalidExpression(self)
         if n_stack != 1:
             raise InvalidExpression(self)
 
@@ -268,12 +652,121 @@ class Expr(MutableSequence):
         return ' '.join(str(t) for t in self)
 
 
-class Token(object):
-    _TERM, _NONTERM, _CONCAT, _ALTER, _STAR, _TYPE, _CODE = range(7)
+class Node(object):
+    # Hash-consed expression tree. Nodes are interned, so structurally equal
+    # trees are the same object, and a tree is a DAG sharing its subtrees.
+    _nodes = WeakValueDictionary()
+
+    def __new__(cls, token, children=()):
+        key = token, children
+        node = cls._nodes.get(key)
+        if node is None:
+            node = super(Node, cls).__new__(cls)
+            node._token = token
+            node._children = children
+            node._size = 1 + sum(c._size for c in children)
+            cls._nodes[key] = node
+        return node
 
-    def __init__(self, text, category):
-        self._text = text
-        self._category = category
+    @classmethod
+    def from_postfix(cls, tokens):
+        stack = []
+        for t in tokens:
+            if t.is_concat or t.is_alter:
+                r = stack.pop()
+                stack[-1] = cls(t, (stack[-1], r))
+            elif t.is_star or t.is_repeat:
+                stack[-1] = cls(t, (stack[-1],))
+            else:
+                stack.append(cls(t))
+        return stack.pop()
+
+    @classmethod
+    def from_dag(cls, dag):
+        nodes = []
+        for token, children in dag:
+            nodes.append(cls(token, tuple(nodes[i] for i in children)))
+        return nodes[-1]
+
+    @property
+    def token(self):
+        return self._token
+
+    @property
+    def children(self):
+        return self._children
+
+    @property
+    def size(self):
+        return self._size  # Number of tokens in the expansion
+
+    def dag(self):
+        # Distinct nodes in postfix order as (token, child indices)
+        ids, dag = {}, []
+        for n in self._distinct():
+            ids[n] = len(dag)
+            dag.append((n._token, tuple(ids[c] for c in n._children)))
+        return dag
+
+    def operands(self):
+        return [n._token for n in self._distinct() if not n._children]
+
+    def postfix(self):
+        stack = [(self, False)]
+        while stack:
+            node, done = stack.pop()
+            if done or not node._children:
+                yield node._token
+            else:
+                stack.append((node, True))
+                stack.extend((c, False) for c in reversed(node._children))
+
+    def substitute(self, old, new):
+        # Replaces every `old` in this tree with `new`, sharing the rest
+        nodes = {}
+        for n in self._distinct():
+            if n is old:
+                nodes[n] = new
+            elif n._children:
+                nodes[n] = Node(n._token, tuple(nodes[c] for c in n._children))
+            else:
+                nodes[n] = n
+        return nodes[self]
+
+    def _distinct(self):
+        visited, stack = set(), [(self, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                yield node
+            elif node not in visited:
+                visited.add(node)
+                stack.append((node, True))
+                stack.extend((c, False) for c in reversed(node._children))
+
+    def __reduce__(self):
+        return Node.from_dag, (self.dag(),)
+
+    def __str__(self):
+        return ' '.join(str(t) for t in self.postfix())
+
+
+class Token(object):
+    # Tokens are interned, so equal tokens are the same object
+    __slots__ = ('_text', '_category', '_hash', '__weakref__')
+    _TERM, _NONTERM, _CONCAT, _ALTER, _STAR, _TYPE, _CODE, _REPEAT = range(8)
+    _tokens = WeakValueDictionary()
+
+    def __new__(cls, text, category):
+        key = text, category
+        tok = cls._tokens.get(key)
+        if tok is None:
+            tok = super(Token, cls).__new__(cls)
+            tok._text = text
+            tok._category = category
+            tok._hash = hash(key)
+            cls._tokens[key] = tok
+        return tok
 
     @classmethod
     def term(cls, text):
@@ -295,6 +788,11 @@ class Token(object):
     def star(cls):
         return Token('*', cls._STAR)
 
+    @classmethod
+    def repeat(cls, n, m):
+        m = '' if m == float('inf') else m
+        return Token('{{{},{}}}'.format(n, m), cls._REPEAT)
+
     @classmethod
     def type(cls, text):
         return Token(text, cls._TYPE)
@@ -327,6 +825,15 @@ class Token(object):
     def is_star(self):
         return self._category == self._STAR
 
+    @property
+    def is_repeat(self):
+        return self._category == self._REPEAT
+
+    @property
+    def bounds(self):
+        n, m = self._text[1:-1].split(',')
+        return int(n), int(m) if m else float('inf')
+
     @property
     def is_type(self):
         return self._category == self._TYPE
@@ -340,17 +847,19 @@ class Token(object):
             return '"{}"'.format(self._text)
         if self.is_nonterm:
             return self._text
-        if self.is_concat or self.is_alter or self.is_star:
+        if self.is_concat or self.is_alter or self.is_star or self.is_repeat:
             return self._text
         if self.is_type or self.is_code:
             return '"{}"'.format(self._text.replace('"', '\\"'))
 
     def __hash__(self):
-        return hash(self._text) + hash(self._category)
+        return self._hash
 
     def __eq__(self, other):
-        return (self._text == other._text and
-                self._category == other._category)
+        return self is other
+
+    def __reduce__(self):
+        return Token, (self._text, self._category)
 
     def __lt__(self, other):
         seq1 = self._category, self._text
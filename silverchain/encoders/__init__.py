@@ -14,3 +14,9 @@ def get_encode_func(lang):
     name = '{}.{}_encoder'.format(__name__, lang)
     module = import_module(name)
     return module.encode
+
+
+def get_iterencode_func(lang):
+    name = '{}.{}_encoder'.format(__name__, lang)
+    module = import_module(name)
+    return module.iterencode
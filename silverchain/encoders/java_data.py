@@ -1,5 +1,42 @@
 # -*- coding: utf-8 -*-
-from textwrap import indent
+from contextlib import contextmanager
+
+
+class Writer(object):
+    # Writes lines into a list of chunks. Nested blocks are indented by the
+    # current prefix, which is not added to blank lines, as textwrap.indent.
+    def __init__(self):
+        self._chunks = []
+        self._prefix = ''
+
+    @property
+    def chunks(self):
+        return self._chunks
+
+    @contextmanager
+    def indent(self):
+        prefix = self._prefix
+        self._prefix += '    '
+        yield
+        self._prefix = prefix
+
+    def line(self, text=''):
+        # `text` is a single line
+        self._chunks.append(self._prefix + text + '\n' if text else '\n')
+
+    def text(self, text):
+        for line in text.splitlines(True):
+            if line.strip():
+                self._chunks.append(self._prefix)
+            self._chunks.append(line)
+        self._chunks.append('\n')
+
+
+def _render(obj):
+    # The rendered code of `obj`, without the newline of its last line
+    w = Writer()
+    obj.render(w)
+    return ''.join(w.chunks)[:-1]
 
 
 class NontermClass(object):
@@ -29,30 +66,42 @@ class NontermClass(object):
     def fname(self):
         return self._name + '.java'
 
+    def render(self, w):
+        w.line('public class ' + self._name + ' {')
+        w.line()
+        with w.indent():
+            if self._is_start:
+                w.line('public void eval() {')
+                with w.indent():
+                    w.text(self._eval)
+                w.line('}')
+                w.line()
+            w.line('private ' + self._name + '() {}')
+            w.line()
+            w.line('Context$ context() {')
+            w.line('    return null;')
+            w.line('}')
+            w.line()
+
+            if not self._name.startswith('_'):
+                w.line('public static final class StartingMethods {')
+                w.line()
+                with w.indent():
+                    w.line('private StartingMethods() {}')
+                    w.line()
+                    for m in sorted(self._starts):
+                        m.render(w)
+                        w.line()
+                w.line('}')
+                w.line()
+
+            for stc in sorted(self._stcs):
+                stc.render(w)
+                w.line()
+        w.line('}')
+
     def __str__(self):
-        c = ''
-        c += 'public class ' + self._name + ' {\n\n'
-        if self._is_start:
-            c += '    public void eval() {\n'
-            c += indent(self._eval, '    '*2) + '\n'
-            c += '    }\n\n'
-        c += '    private ' + self._name + '() {}\n\n'
-        c += '    Context$ context() {\n'
-        c += '        return null;\n'
-        c += '    }\n\n'
-
-        if not self._name.startswith('_'):
-            c += '    public static final class StartingMethods {\n\n'
-            c += '        private StartingMethods() {}\n\n'
-            for m in sorted(self._starts):
-                c += indent(str(m), '    '*2) + '\n\n'
-            c += '    }\n\n'
-
-        for stc in sorted(self._stcs):
-            c += indent(str(stc), '    ') + '\n\n'
-
-        c += '}'
-        return c
+        return _render(self)
 
 
 class StateClass(object):
@@ -66,138 +115,175 @@ class StateClass(object):
     def methods(self):
         return self._methods
 
+    def render(self, w):
+        extends = ' extends ' + self._name if self._extends else ''
+        w.line('public static final class State' + self._idx + '<T>' +
+               extends + ' {')
+        w.line()
+        with w.indent():
+            w.line('final Context$ context;')
+            w.line()
+            w.line('State' + self._idx + '(Context$ context) {')
+            w.line('    this.context = context;')
+            w.line('}')
+            w.line()
+
+            if self._extends:
+                w.line('Context$ context() {')
+                w.line('    return context;')
+                w.line('}')
+                w.line()
+
+            for m in sorted(self._methods):
+                m.render(w)
+                w.line()
+        w.line('}')
+
     def __str__(self):
-        c = ''
-        c += 'public static final class State' + self._idx + '<T>'
-        c += ' extends {}'.format(self._name) if self._extends else ''
-        c += ' {\n\n'
-        c += '    final Context$ context;\n\n'
-        c += '    State' + self._idx + '(Context$ context) {\n'
-        c += '        this.context = context;\n'
-        c += '    }\n\n'
-
-        if self._extends:
-            c += '    Context$ context() {\n'
-            c += '        return context;\n'
-            c += '    }\n\n'
-
-        for m in sorted(self._methods):
-            c += indent(str(m), '    ') + '\n\n'
-
-        c += '}'
-        return c
+        return _render(self)
 
     def __lt__(self, other):
         return int(self._idx) < int(other._idx)
 
 
+_reserved = frozenset([
+    'abstract', 'assert', 'boolean', 'break', 'byte', 'case', 'catch',
+    'char', 'class', 'const', 'continue', 'default', 'do', 'double',
+    'else', 'enum', 'extends', 'false', 'final', 'finally', 'float',
+    'for', 'goto', 'if', 'implements', 'import', 'instanceof', 'int',
+    'interface', 'long', 'native', 'new', 'null', 'package', 'private',
+    'protected', 'public', 'return', 'short', 'static', 'strictfp',
+    'super', 'switch', 'synchronized', 'this', 'throw', 'throws',
+    'transient', 'true', 'try', 'void', 'volatile', 'while'
+])
+
+
 class Method(object):
     @staticmethod
     def escape_reserved(name):
-        reserved = [
-            'abstract', 'assert', 'boolean', 'break', 'byte', 'case', 'catch',
-            'char', 'class', 'const', 'continue', 'default', 'do', 'double',
-            'else', 'enum', 'extends', 'false', 'final', 'finally', 'float',
-            'for', 'goto', 'if', 'implements', 'import', 'instanceof', 'int',
-            'interface', 'long', 'native', 'new', 'null', 'package', 'private',
-            'protected', 'public', 'return', 'short', 'static', 'strictfp',
-            'super', 'switch', 'synchronized', 'this', 'throw', 'throws',
-            'transient', 'true', 'try', 'void', 'volatile', 'while'
-        ]
-        return name + '_' if name in reserved else name
-
-    def __init__(self, ret, name, arg=None, is_native_arg=False, repeat=False):
-        self._ret = ''
-        for sym, idx in ret:
-            ntc = NontermClass.to_class_name(sym)
-            self._ret += ntc + '.State' + str(idx) + '<'
+        return name + '_' if name in _reserved else name
+
+    def __init__(self, ret, name, arg=None, is_native_arg=False, repeat=False,
+                 pushes=()):
+        # Only the parts used to sort methods are built here. The body is
+        # built when the method is rendered. `pushes` are the ids of the
+        # states in `ret` after the first, which are returned to later.
+        self._rets = [NontermClass.to_class_name(sym) + '.State' + str(idx)
+                      for sym, idx in ret]
+        self._ret = ''.join(r + '<' for r in self._rets)
         self._ret += 'T' + '>' * len(ret)
 
         name = self.escape_reserved(name[0].lower() + name[1:])
         self._name = name
 
-        if arg is None:
+        self._type = arg
+        self._is_native_arg = is_native_arg
+        self._repeat = repeat
+        self._pushes = pushes
+        if arg is None or arg == '':
             self._arg = ''
-            self._madd = ''
-        elif arg == '':
-            self._arg = ''
-            self._madd = 'context.methods.add(new Method$("' + name + '"));'
         elif is_native_arg:
             self._arg = arg + ' ' + name
-            self._madd = 'context.methods.add('
-            self._madd += 'new Method$("' + name + '", ' + name + '));'
-            if repeat:
-                self._arg += ', ' + self._arg.replace(' ', '... ') + 'Array'
-                forstmt = '\nfor ({} $: {}Array) {{\n'.format(arg, name)
-                forstmt += '    context.methods'
-                forstmt += '.add(new Method$("{}", $));\n'.format(name)
-                forstmt += '}'
-                self._madd += forstmt
         else:
             ntc = NontermClass.to_class_name(arg)
-            val = ntc[0].lower() + ntc[1:]
-            self._arg = ntc + ' ' + val
-            self._madd = 'context.methods.addAll('
-            self._madd += val + '.context().methods);'
-            if repeat:
-                self._arg += ', ' + self._arg.replace(' ', '... ') + 'Array'
-                forstmt = '\nfor ({} $: {}Array) {{\n'.format(ntc, val)
-                forstmt += '    context.methods.addAll($.context().methods);\n'
-                forstmt += '}'
-                self._madd += forstmt
-
-        if 1 < len(ret):
-            c = self._ret.split('<', 2)[1]
-            self._cpush = 'context.classes.push(' + c + '.class);'
-        else:
-            self._cpush = ''
-
-        if len(ret):
-            r = self._ret.split('<', 1)[0]
-            self._new = 'return new ' + r + '<>(context);'
-        else:
-            n = ''
-            n += 'try {\n'
-            n += '    return (T) context.classes\n'
-            n += '            .pop()\n'
-            n += '            .getDeclaredConstructor(Context$.class)\n'
-            n += '            .newInstance(context);\n'
-            n += '} catch (Exception e) {\n'
-            n += '    throw new RuntimeException(e);'
-            n += '}\n'
-            self._new = n
+            self._arg = ntc + ' ' + ntc[0].lower() + ntc[1:]
+        if repeat and self._arg:
+            self._arg += ', ' + self._arg.replace(' ', '... ') + 'Array'
 
     def __lt__(self, other):
-        return self._name < other._name
+        seq1 = self._name, self._arg, self._ret
+        seq2 = other._name, other._arg, other._ret
+        return seq1 < seq2
+
+    def signature(self):
+        return 'public ' + self._ret + ' ' + self._name + '(' + self._arg + ')'
+
+    def render(self, w):
+        if self._ret == 'T':
+            w.line('@SuppressWarnings("unchecked")')
+        w.line(self.signature() + ' {')
+        with w.indent():
+            self.render_body(w)
+        w.line('}')
+
+    def render_body(self, w):
+        name, arg = self._name, self._type
+        if arg == '':
+            w.line('context.methods.add(new Method$("' + name + '"));')
+        elif arg is not None and self._is_native_arg:
+            w.line('context.methods.add(new Method$("' + name + '", ' +
+                   name + '));')
+            if self._repeat:
+                w.line('for ({} $: {}Array) {{'.format(arg, name))
+                w.line('    context.methods'
+                       '.add(new Method$("{}", $));'.format(name))
+                w.line('}')
+        elif arg is not None:
+            ntc = NontermClass.to_class_name(arg)
+            val = ntc[0].lower() + ntc[1:]
+            w.line('context.methods.addAll(' + val + '.context().methods);')
+            if self._repeat:
+                w.line('for ({} $: {}Array) {{'.format(ntc, val))
+                w.line('    context.methods.addAll($.context().methods);')
+                w.line('}')
+
+        # The state returned to last is pushed first
+        for i in reversed(self._pushes):
+            w.line('context.push(' + str(i) + ');')
+
+        if self._rets:
+            w.line('return new ' + self._rets[0] + '<>(context);')
+        else:
+            w.line('return (T) Return$.create(context.pop(), context);')
 
     def __str__(self):
-        r = self._ret
-        n = self._name
-        a = self._arg
-        c = ''
-        c += 'public ' + r + ' ' + n + '(' + a + ') {\n'
+        return _render(self)
 
-        if self._madd:
-            c += indent(self._madd, '    ') + '\n'
 
-        if self._cpush:
-            c += '    ' + self._cpush + '\n'
+class StartingMethod(Method):
+    def signature(self):
+        sig = super(StartingMethod, self).signature()
+        sig = sig.replace('public ', 'public static ')
+        return sig.replace('<T>', '<Bottom$>')
 
-        c += indent(self._new, '    ') + '\n'
-        c += '}'
+    def render_body(self, w):
+        w.line('Context$ context = new Context$();')
+        super(StartingMethod, self).render_body(w)
 
-        if r == 'T':
-            c = '@SuppressWarnings("unchecked")\n' + c
-        return c
 
+class ReturnClass(object):
+    # Instantiates the state of a pushed id without reflection
+    def __init__(self, states):
+        self._states = [(NontermClass.to_class_name(sym), str(idx))
+                        for sym, idx in states]
+
+    @property
+    def fname(self):
+        return 'Return$.java'
+
+    def render(self, w):
+        w.line('final class Return$ {')
+        w.line()
+        with w.indent():
+            w.line('private Return$() {}')
+            w.line()
+            w.line('static Object create(int state, Context$ context) {')
+            with w.indent():
+                w.line('switch (state) {')
+                with w.indent():
+                    for i, (name, idx) in enumerate(self._states):
+                        w.line('case ' + str(i) + ':')
+                        w.line('    return new ' + name + '.State' + idx +
+                               '<>(context);')
+                    w.line('default:')
+                    w.line('    throw new IllegalStateException();')
+                w.line('}')
+            w.line('}')
+            w.line()
+        w.line('}')
 
-class StartingMethod(Method):
     def __str__(self):
-        lines = super(StartingMethod, self).__str__().splitlines()
-        lines[0] = lines[0].replace('public ', 'public static ')
-        lines[0] = lines[0].replace('<T>', '<Bottom$>')
-        lines.insert(1, '    Context$ context = new Context$();')
-        return '\n'.join(lines)
+        return _render(self)
 
 
 BOTTOM = 'Bottom$.java', """
@@ -207,14 +293,27 @@ final class Bottom$ {}
 
 CONTEXT = 'Context$.java', """
 import java.util.ArrayList;
-import java.util.Stack;
+import java.util.Arrays;
 
 final class Context$ {
 
-    final Stack<Class<?>> classes = new Stack<>();
-
     final ArrayList<Method$> methods = new ArrayList<>();
 
+    private int[] states = new int[16];
+
+    private int depth;
+
+    void push(int state) {
+        if (depth == states.length) {
+            states = Arrays.copyOf(states, 2 * depth);
+        }
+        states[depth++] = state;
+    }
+
+    int pop() {
+        return states[--depth];
+    }
+
 }
 """.strip()
 
@@ -1,22 +1,54 @@
 # -*- coding: utf-8 -*-
 from .java_data import NontermClass, StateClass, Method, StartingMethod
+from .java_data import ReturnClass
 from .java_data import BOTTOM, CONTEXT, METHOD
 
 
-def encode(table):
-    files = dict((BOTTOM, CONTEXT, METHOD))
+def encode(table, syms=None):
+    # Only the classes of `syms` are generated if it is given
+    return {name: ''.join(chunks) for name, chunks in iterencode(table, syms)}
 
-    ntcs = {}
-    for sym in table.groups:
-        ntcs[sym] = NontermClass(sym.text, sym == table.start, table.eval)
 
-    stcs = {}
+def iterencode(table, syms=None):
+    # Yields the name and the chunks of each file. A class is built from the
+    # cells of its nonterminal only, so classes are rendered one at a time.
+    pkg = 'package {};\n\n'.format(table.start.text.lower())
+    for name, content in (BOTTOM, CONTEXT, METHOD):
+        yield name, (pkg, content)
+
+    rets = sorted(table.returns, key=table.returns.get)
+    rtc = ReturnClass([(st.sym.text, st.idx) for st in rets])
+    yield rtc.fname, (pkg, str(rtc))
+
+    states = {}
     for st in table.states:
+        states.setdefault(st.sym, []).append(st)
+
+    for sym, cells in table.groups.items():
+        if syms is None or sym in syms:
+            ntc = _nonterm_class(table, sym, cells, states[sym])
+            yield ntc.fname, _chunks(pkg, ntc)
+
+
+def _chunks(pkg, ntc):
+    yield pkg
+    yield str(ntc)
+
+
+def _nonterm_class(table, sym, cells, states):
+    ntc = NontermClass(sym.text, sym == table.start, table.eval)
+
+    stcs = {}
+    for st in states:
         stcs[st] = StateClass(st.sym.text, st.idx, st.is_fin)
-        ntcs[st.sym].stcs.add(stcs[st])
+        ntc.stcs.add(stcs[st])
 
-    for c in table.cells:
+    # Repeats are looked up through the table's index, so that encoding is
+    # linear in the size of the table
+    occupied = table.by_src_sym
+    for c in cells:
         ret = [(d.sym.text, d.idx) for d in c.dst]
+        pushes = [table.returns[d] for d in c.dst[1:]]
         name = c.sym.text
 
         arg = None
@@ -32,31 +64,20 @@ def encode(table):
             is_native_arg = False
 
         if c.src.idx == 0:
-            method = StartingMethod(ret, name, arg, is_native_arg)
-            ntcs[c.src.sym].starts.add(method)
-
-        repeat = False
-        if 0 < len(c.dst):
-            for _c in table.cells:
-                if c.dst[0] == _c.src:
-                    if _c.sym == c.sym:
-                        repeat = True
-                        break
-        method = Method(ret, name, arg, is_native_arg, repeat)
-        stcs[c.src].methods.add(method)
-
-    for sym, ntc in ntcs.items():
-        ret = [(sym.text, 0)]
-        name = sym.text
-        method = StartingMethod(ret, name)
-        for m in ntc.starts:
-            if m._name == name:
-                break
-        else:
+            method = StartingMethod(ret, name, arg, is_native_arg,
+                                    pushes=pushes)
             ntc.starts.add(method)
 
-    for c in ntcs.values():
-        files[c.fname] = str(c)
+        repeat = 0 < len(c.dst) and (c.dst[0], c.sym) in occupied
+        method = Method(ret, name, arg, is_native_arg, repeat, pushes)
+        stcs[c.src].methods.add(method)
 
-    pkg = 'package {};\n\n'.format(table.start.text.lower())
-    return {name: pkg + content for name, content in files.items()}
+    ret = [(sym.text, 0)]
+    name = sym.text
+    method = StartingMethod(ret, name)
+    for m in ntc.starts:
+        if m._name == name:
+            break
+    else:
+        ntc.starts.add(method)
+    return ntc
@@ -32,6 +32,13 @@ class MultipleTypeDefinition(Exception):
         super(MultipleTypeDefinition, self).__init__(msg)
 
 
+class InvalidSyntax(Exception):
+    def __init__(self, found, line, col):
+        found = repr(found) if found else 'end of input'
+        msg = 'Unexpected {} at line {}, column {}.'.format(found, line, col)
+        super(InvalidSyntax, self).__init__(msg)
+
+
 # Raised in Grammar.validate --------------------------------------------------
 class InvalidStartSymbol(Exception):
     def __init__(self):
@@ -56,3 +63,38 @@ class InvalidExpression(Exception):
     def __init__(self, expr):
         msg = '`{}` is invalid.'.format(expr)
         super(InvalidExpression, self).__init__(msg)
+
+
+# Raised in Table -------------------------------------------------------------
+class FrozenTable(Exception):
+    def __init__(self):
+        msg = 'A frozen table cannot be modified.'
+        super(FrozenTable, self).__init__(msg)
+
+
+# Raised in CompactTable.load -------------------------------------------------
+class InvalidTableFile(Exception):
+    def __init__(self, path, reason):
+        msg = '{} cannot be loaded: {}.'.format(path, reason)
+        super(InvalidTableFile, self).__init__(msg)
+
+
+# Raised in tabulate ----------------------------------------------------------
+class StateExplosion(Exception):
+    def __init__(self, sym, n_states, limit):
+        msg = 'Tabulating {} exceeded the {} limit ({} DFA states).'
+        super(StateExplosion, self).__init__(msg.format(sym, limit, n_states))
+        self._args = sym, n_states, limit
+
+    def __reduce__(self):
+        return StateExplosion, self._args
+
+
+class RepetitionTooLarge(Exception):
+    def __init__(self, sym, n_states):
+        msg = 'Repetitions in {} expand to {} NFA states.'
+        super(RepetitionTooLarge, self).__init__(msg.format(sym, n_states))
+        self._args = sym, n_states
+
+    def __reduce__(self):
+        return RepetitionTooLarge, self._args
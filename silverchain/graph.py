@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+
+
+class DiGraph(object):
+    def __init__(self, edges=()):
+        self._succs = {}
+        for src, dst in edges:
+            self.add_edge(src, dst)
+
+    def add_node(self, n):
+        self._succs.setdefault(n, {})
+
+    def add_nodes_from(self, ns):
+        for n in ns:
+            self.add_node(n)
+
+    def add_edge(self, src, dst):
+        self.add_node(dst)
+        self._succs.setdefault(src, {})[dst] = None
+
+    def remove_edge(self, src, dst):
+        del self._succs[src][dst]
+
+    def has_edge(self, src, dst):
+        return dst in self._succs.get(src, ())
+
+    def nodes(self):
+        return list(self._succs)
+
+    def successors(self, n):
+        return list(self._succs[n])
+
+    def edges(self, ns=None):
+        ns = self._succs if ns is None else ns
+        return [(s, d) for s in ns for d in self._succs[s]]
+
+    def view(self, node_filter=None, edge_filter=None):
+        return GraphView(self, node_filter, edge_filter)
+
+    def __contains__(self, n):
+        return n in self._succs
+
+
+class GraphView(object):
+    def __init__(self, graph, node_filter=None, edge_filter=None):
+        self._graph = graph
+        self._node_filter = node_filter or (lambda n: True)
+        self._edge_filter = edge_filter or (lambda s, d: True)
+
+    def nodes(self):
+        return [n for n in self._graph.nodes() if self._node_filter(n)]
+
+    def successors(self, n):
+        return [d for d in self._graph.successors(n)
+                if self._node_filter(d) and self._edge_filter(n, d)]
+
+    def edges(self, ns=None):
+        ns = self.nodes() if ns is None else ns
+        return [(s, d) for s in ns for d in self.successors(s)]
+
+    def __contains__(self, n):
+        return n in self._graph and self._node_filter(n)
+
+
+def bfs_edges(graph, source):
+    visited = {source}
+    queue = deque([source])
+    while queue:
+        parent = queue.popleft()
+        for child in graph.successors(parent):
+            if child not in visited:
+                yield parent, child
+                visited.add(child)
+                queue.append(child)
+
+
+def descendants(graph, source):
+    return {d for _, d in bfs_edges(graph, source)}
+
+
+def on_cycle(graph, n):
+    visited, stack = set(), graph.successors(n)
+    while stack:
+        d = stack.pop()
+        if d == n:
+            return True
+        if d not in visited:
+            visited.add(d)
+            stack.extend(graph.successors(d))
+    return False
+
+
+def strongly_connected_components(graph):
+    # Tarjan's algorithm without recursion. Components are yielded in reverse
+    # topological order.
+    index, low, on_stack = {}, {}, set()
+    stack = []
+    for root in graph.nodes():
+        if root in index:
+            continue
+
+        work = [(root, iter(graph.successors(root)))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            v, succs = work[-1]
+            for w in succs:
+                if w not in index:
+                    index[w] = low[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(graph.successors(w))))
+                    break
+                if w in on_stack:
+                    low[v] = min(low[v], index[w])
+            else:
+                work.pop()
+                if low[v] == index[v]:
+                    scc = set()
+                    while v not in scc:
+                        scc.add(stack.pop())
+                    on_stack.difference_update(scc)
+                    yield scc
+                if work:
+                    u = work[-1][0]
+                    low[u] = min(low[u], low[v])
@@ -1,165 +1,247 @@
 # -*- coding: utf-8 -*-
-from pyparsing import alphas, nums, restOfLine
-from pyparsing import Forward, Keyword, QuotedString, Word
-from pyparsing import OneOrMore, Optional, Or, ZeroOrMore
-from pyparsing import ParserElement
+import re
 from .data import Grammar, Expr, Token
 from .encoders import languages
-from .errors import InvalidQuantifier
+from .errors import InvalidQuantifier, InvalidSyntax
 from .errors import MultipleEvalCode
 from .errors import MultipleStartSymbol, NoStartSymbol
 from .errors import MultipleTypeDefinition
 
 
-# Parser Elements -------------------------------------------------------------
-_nsym = Word(alphas)
-_tsym = '"' + Word(alphas) + '"'
-_type = QuotedString('"')
-_ltag = '@' + Or(languages)
-
-_uops = '{' + Word(nums) + Optional(',' + Optional(Word(nums))) + '}'
-_uops = _uops | '*' | '+' | '?'
-_expr = Forward()
-_elem = _nsym | _tsym | '(' + _expr + ')'
-_fact = _elem + Optional(_uops)
-_term = OneOrMore(_fact)
-_expr << _term + ZeroOrMore('|' + _term)
-
-_sdef = Keyword('START') + '=' + _nsym
-_prod = _nsym + '->' + _expr
-_tdef = _nsym + Optional(_ltag) + ':' + _type
-_edef = Keyword('EVAL') + Optional(_ltag) + '=' + QuotedString('"', '\\')
-_cmnt = ('#' + restOfLine).suppress()
-_rule = (_sdef | _prod | _tdef | _edef) + ';' + Optional(_cmnt)
-_grammar = OneOrMore(_rule | _cmnt)
-
-
-# Parse Actions ---------------------------------------------------------------
-def _nsym_action(result):
-    return result[0]
-
-
-def _tsym_action(result):
-    return ''.join(result)
-
-
-def _type_action(result):
-    return result[0]
-
-
-def _ltag_action(result):
-    return result[1]
-
-
-def _uops_action(result):
-    if result[0] == '*':
-        return 0, float('inf')
-    if result[0] == '+':
-        return 1, float('inf')
-    if result[0] == '?':
-        return 0, 1
-
-    n = int(result[1])
-    if result[2] == '}':
-        return n, n
-    elif result[3] == '}':
-        return n, float('inf')
-    else:
-        return n, int(result[3])
-
-
-def _elem_action(result):
-    return ' '.join(result).strip('()')
-
-
-def _fact_action(result):
-    elem, (n, m) = result[0], (result[1:2] or [(1, 1)])[0]
-    if m < n:
-        raise InvalidQuantifier(n, m)
-
-    ls = [elem] * n
-    if m == float('inf'):
-        ls += ['{} *'.format(elem)]
-    else:
-        ls += ['{} "" |'.format(elem)] * (m - n)
-
-    ls = sum(([e, '&'] for e in ls[1:]), ls[0:1])
-    return ' '.join(ls or ['""'])
-
-
-def _term_action(result):
-    return ' '.join(sum(([e, '&'] for e in result[1:]), result[0:1]))
-
-
-def _expr_action(result):
-    return ' '.join(sum(([e, '|'] for e in result[2::2]), result[0:1]))
-
-
-def _sdef_action(result):
-    return result[0], result[2], result[1]
-
-
-def _prod_action(result):
-    return tuple(result[0:1] + result[2].split() + result[1:2])
-
-
-def _tdef_action(result):
-    return tuple(result[:-2]), result[-1], result[-2]
-
-
-def _edef_action(result):
-    return tuple(result[:-2]), result[-1], result[-2]
-
-
-def _rule_action(result):
-    return result[:-1]
-
-
-def _grammar_action(result):
-    return result[:]
-
-
-for name in dir():
-    elem = locals().get(name)
-    action = locals().get(name + '_action')
-    if isinstance(elem, ParserElement) and action is not None:
-        elem.setParseAction(action)
+# Lexer -----------------------------------------------------------------------
+_lexeme = re.compile(r'''
+    (?:\s|\#[^\n]*)*
+    (?:
+        (?P<name>[A-Za-z]+)
+      | (?P<num>[0-9]+)
+      | (?P<str>"(?:[^"\\\n\r]|\\.)*")
+      | (?P<op>->|[=:;@()|*+?{},])
+      | (?P<eof>\Z)
+      | (?P<error>[\s\S])
+    )
+''', re.VERBOSE)
+
+_tsym = re.compile(r'"\s*([A-Za-z]+)\s*"\Z')
+
+_type = re.compile(r'"[^"]*"\Z')
+
+_wsesc = (('\\t', '\t'), ('\\n', '\n'), ('\\f', '\f'), ('\\r', '\r'))
+
+
+def _lex(text):
+    # Yields (kind, text, position). The kind of an operator is itself.
+    # Characters that start no token are yielded as errors and raised when
+    # the parser reaches them.
+    pos = 0
+    while True:
+        m = _lexeme.match(text, pos)
+        kind = m.lastgroup
+        if kind == 'op':
+            kind = m.group(kind)
+        yield kind, m.group(m.lastgroup), m.start(m.lastgroup)
+        if kind in ('eof', 'error'):
+            return
+        pos = m.end()
+
+
+def _unquote(text, escape):
+    text = text[1:-1]
+    if '\\' in text:
+        for lit, ch in _wsesc:
+            text = text.replace(lit, ch)
+        if escape:
+            text = re.sub(r'\\(.)', r'\g<1>', text)
+    return text
+
+
+def _syntax_error(text, pos):
+    line = text.count('\n', 0, pos) + 1
+    col = pos - text.rfind('\n', 0, pos)
+    return InvalidSyntax(text[pos:pos + 1], line, col)
+
+
+# Parser ----------------------------------------------------------------------
+class _Parser(object):
+    # Tokens are read lazily, so errors are raised in the order of the text
+    def __init__(self, text):
+        self._text = text
+        self._toks = _lex(text)
+        self._tok = next(self._toks)
+
+    def peek(self):
+        return self._tok[0]
+
+    def accept(self, kind):
+        if self._tok[0] != kind:
+            return None
+        text = self._tok[1]
+        self._tok = next(self._toks)
+        return text
+
+    def expect(self, kind):
+        text = self.accept(kind)
+        if text is None:
+            raise self.error()
+        return text
+
+    def error(self):
+        return _syntax_error(self._text, self._tok[2])
+
+    def rule(self):
+        lhs = self.expect('name')
+        tag = None
+        if self.accept('@'):
+            if self._tok[1] not in languages:
+                raise self.error()
+            tag = self.expect('name')
+
+        if tag is None and self.accept('->'):
+            rule = lhs, '->', self.expr()
+        elif self.accept(':'):
+            if not _type.match(self._tok[1]):
+                raise self.error()
+            rule = (lhs, tag), ':', _unquote(self.expect('str'), False)
+        elif lhs == 'START' and tag is None and self.accept('='):
+            rule = lhs, '=', self.expect('name')
+        elif lhs == 'EVAL' and self.accept('='):
+            rule = (lhs, tag), '=', _unquote(self.expect('str'), True)
+        else:
+            raise self.error()
+
+        self.expect(';')
+        return rule
+
+    def expr(self):
+        toks = self.term()
+        while self.accept('|'):
+            toks += self.term()
+            toks.append(Token.alter())
+        return toks
+
+    def term(self):
+        toks = self.fact()
+        while self.peek() in ('name', 'str', '('):
+            toks += self.fact()
+            toks.append(Token.concat())
+        return toks
+
+    def fact(self):
+        elem = self.elem()
+        if self.peek() == '{':
+            n, m = self.bounds()
+            if m < n:
+                raise InvalidQuantifier(n, m)
+            if m == 0:
+                return [Token.term('')]
+            return elem + [Token.repeat(n, m)]
+
+        n, m = self.uops()
+
+        ls = [elem] * n
+        if m == float('inf'):
+            ls += [elem + [Token.star()]]
+        else:
+            ls += [elem + [Token.term(''), Token.alter()]] * (m - n)
+
+        toks = list(ls[0]) if ls else [Token.term('')]
+        for e in ls[1:]:
+            toks += e
+            toks.append(Token.concat())
+        return toks
+
+    def elem(self):
+        name = self.accept('name')
+        if name is not None:
+            return [Token.nonterm(name)]
+
+        if self.peek() == 'str':
+            m = _tsym.match(self._tok[1])
+            if m is None:
+                raise self.error()
+            self.expect('str')
+            return [Token.term(m.group(1))]
+
+        self.expect('(')
+        toks = self.expr()
+        self.expect(')')
+        return toks
+
+    def uops(self):
+        if self.accept('*'):
+            return 0, float('inf')
+        if self.accept('+'):
+            return 1, float('inf')
+        if self.accept('?'):
+            return 0, 1
+        return 1, 1
+
+    def bounds(self):
+        self.expect('{')
+        n = int(self.expect('num'))
+        if self.accept('}'):
+            return n, n
+        self.expect(',')
+        if self.accept('}'):
+            return n, float('inf')
+        m = int(self.expect('num'))
+        self.expect('}')
+        return n, m
 
 
 # Main ------------------------------------------------------------------------
 def parse(text, lang):
-    sdefs, prods, tdefs, edefs = _parse(text, lang)
-    _validate_defs(sdefs, tdefs, edefs)
-    return _build_objs(sdefs, prods, tdefs, edefs)
-
-
-def _parse(text, lang):
-    sdefs, prods, tdefs, edefs = set(), {}, {}, set()
-
-    for r in _grammar.parseString(text, parseAll=True):
-        op = r[-1]
+    # `lang` is a language or a list of languages. For a list, the grammar
+    # is not bound to a language: nonterminals typed in them map to None,
+    # and `Grammar.bind` returns the grammar of each language.
+    sdefs, prods, tdefs, edefs = _parse(text)
+    grammars = {}
+    for name in ([lang] if isinstance(lang, str) else lang):
+        ts, es = _bind_defs(tdefs, edefs, name)
+        _validate_defs(sdefs, ts, es)
+        grammars[name] = _build_objs(sdefs, prods, ts, es)
+    if isinstance(lang, str):
+        return grammars[lang]
+
+    first = next(iter(grammars.values()))
+    tdefs = {lhs: None for g in grammars.values() for lhs in g.tdefs}
+    langs = {name: (g.tdefs, g.eval) for name, g in grammars.items()}
+    return Grammar(first.start, first.prods, tdefs, Token.code(''), langs)
+
+
+def _parse(text):
+    # Definitions of all languages are kept with their tags, in text order
+    sdefs, prods, tdefs, edefs = set(), {}, [], []
+
+    parser = _Parser(text)
+    while parser.peek() != 'eof':
+        lhs, op, rhs = parser.rule()
         if op == '=':
-            lhs, rhs = r[0], r[1]
             if lhs == 'START':
                 sdefs.add(rhs)
-            elif len(lhs) == 1 or lhs[1] == lang:
-                edefs.add(rhs)
+            else:
+                edefs.append((lhs[1], rhs))
 
         elif op == '->':
-            lhs, rhs = r[0], r[1:-1]
             if lhs in prods:
-                prods[lhs] += rhs + ('|',)
+                prods[lhs] += rhs + [Token.alter()]
             else:
                 prods[lhs] = rhs
 
         elif op == ':':
-            lhs, rhs = r[0], r[1]
-            if len(lhs) == 1 or lhs[1] == lang:
-                tdefs.setdefault(lhs[0], set()).add(rhs)
+            tdefs.append((lhs[0], lhs[1], rhs))
 
     return sdefs, prods, tdefs, edefs
 
 
+def _bind_defs(tdefs, edefs, lang):
+    ts = {}
+    for lhs, tag, rhs in tdefs:
+        if tag in (None, lang):
+            ts.setdefault(lhs, set()).add(rhs)
+    es = {rhs for tag, rhs in edefs if tag in (None, lang)}
+    return ts, es
+
+
 def _validate_defs(sdefs, tdefs, edefs):
     if len(sdefs) == 0:
         raise NoStartSymbol()
@@ -178,19 +260,7 @@ def _validate_defs(sdefs, tdefs, edefs):
 def _build_objs(sdefs, prods, tdefs, edefs):
     _prods = {}
     for lhs, rhs in prods.items():
-        toks = []
-        for t in rhs:
-            if t.isalpha():
-                toks.append(Token.nonterm(t))
-            elif t.startswith('"'):
-                toks.append(Token.term(t.strip('"')))
-            elif t == '&':
-                toks.append(Token.concat())
-            elif t == '|':
-                toks.append(Token.alter())
-            elif t == '*':
-                toks.append(Token.star())
-        _prods[Token.nonterm(lhs)] = Expr(toks)
+        _prods[Token.nonterm(lhs)] = Expr(rhs)
     prods = _prods
 
     _tdefs = {}
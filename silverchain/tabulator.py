@@ -1,58 +1,49 @@
 # -*- coding: utf-8 -*-
 from collections import deque
-from itertools import combinations
-from networkx import DiGraph, descendants
+from concurrent.futures import ProcessPoolExecutor
+from time import time
 from .data import Token
 from .data import Table, Cell, State, Symbol
+from .errors import RepetitionTooLarge, StateExplosion
+from .graph import DiGraph, strongly_connected_components as sccs
 
 
-def tabulate(grammar):
-    tokens = set()
-    transitions = {}
-    initials = {}
-    finals = {}
-    n_states = {}
+def tabulate(grammar, jobs=1, algorithm='thompson', cache=None,
+             max_states=None, max_cells=None, timeout=None):
+    if algorithm not in _constructions:
+        raise ValueError('Unknown algorithm: {}'.format(algorithm))
 
-    eps = Token.term('')
-    for lhs, rhs in grammar.prods.items():
-        tokens.add(lhs)
-
-        n, stack = 0, []
-        for t in rhs:
-            if t.is_concat:
-                trs_r, ini_r, fin_r = stack.pop()
-                trs_l, ini_l, fin_l = stack.pop()
-                ini, fin = ini_l, fin_r
-                trs = trs_l | trs_r | {(fin_l, eps, ini_r)}
-                stack.append((trs, ini, fin))
-                tokens.add(eps)
-
-            elif t.is_alter:
-                trs_r, ini_r, fin_r = stack.pop()
-                trs_l, ini_l, fin_l = stack.pop()
-                ini, fin = n, n + 1
-                trs = {(ini, eps, ini_r), (fin_r, eps, fin),
-                       (ini, eps, ini_l), (fin_l, eps, fin)} | trs_l | trs_r
-                stack.append((trs, ini, fin))
-                n += 2
-                tokens.add(eps)
-
-            elif t.is_star:
-                trs, ini, fin = stack.pop()
-                trs |= {(n, eps, ini), (fin, eps, n)}
-                stack.append((trs, n, n))
-                n += 1
-                tokens.add(eps)
-
-            else:
-                ini, fin = n, n + 1
-                trs = {(n, t, fin)}
-                stack.append((trs, ini, fin))
-                n += 2
-                tokens.add(t)
-
-        transitions[lhs], initials[lhs], finals[lhs] = stack.pop()
-        n_states[lhs] = n
+    # Limits are checked per nonterminal during subset construction
+    deadline = None if timeout is None else time() + timeout
+    limits = max_states, max_cells, deadline
+
+    # `cache` maps (algorithm, tree) to the DFA of an expanded expression.
+    # Trees are hash-consed, so equal expressions share a key.
+    cache = {} if cache is None else cache
+    prods = list(grammar.prods.items())
+    keys = [(algorithm, rhs.tree) for _, rhs in prods]
+    todo = {}
+    for (lhs, _), k in zip(prods, keys):
+        if k not in cache:
+            todo.setdefault(k, lhs.text)
+    args = [(name, rhs, alg, limits) for (alg, rhs), name in todo.items()]
+    if 1 < jobs:
+        with ProcessPoolExecutor(jobs) as executor:
+            futures = [executor.submit(_tabulate_expr, *a) for a in args]
+            try:
+                cache.update(zip(todo, (f.result() for f in futures)))
+            except Exception:
+                for f in futures:
+                    f.cancel()
+                raise
+    else:
+        for k, a in zip(todo, args):
+            cache[k] = _tabulate_expr(*a)
+    dfas = [cache[k] for k in keys]
+
+    tokens = {lhs for lhs, _ in prods}
+    for trs, _ in dfas:
+        tokens.update(tok for _, tok, _ in trs)
 
     symbols = {}
     for tok in tokens:
@@ -63,129 +54,362 @@ def tabulate(grammar):
             typ = typ.text if typ else None
             symbols[tok] = Symbol.nonterm(tok.text, typ)
 
-    states = {}
-    for tok, n in n_states.items():
-        for i in range(n):
-            sym = symbols[tok]
-            is_ini = (i == initials[tok])
-            is_fin = (i == finals[tok])
-            states[tok, i] = State(sym, i, is_ini, is_fin)
-
     cells = set()
-    for tok, trs in transitions.items():
-        for tr in trs:
-            src = states[tok, tr[0]]
-            sym = symbols[tr[1]]
-            dst = (states[tok, tr[2]],)
-            c = Cell(src, sym, dst)
-            cells.add(c)
+    for (lhs, _), (trs, fins) in zip(prods, dfas):
+        states = {}
+        for idx in {src for src, _, _ in trs} | {dst for _, _, dst in trs}:
+            states[idx] = State(symbols[lhs], idx, idx == 0, idx in fins)
+        for src, tok, dst in trs:
+            cells.add(Cell(states[src], symbols[tok], (states[dst],)))
 
     start = symbols[grammar.start]
     eval = grammar.eval.text
-    table = Table(start, cells, eval)
-    return _to_dfa(table)
+    return Table(start, cells, eval)
+
+
+def bind(table, grammar):
+    # Types the nonterminals of a table tabulated from an unbound grammar,
+    # and sets the eval code, as given by `grammar`
+    syms = {}
+    for tok, typ in grammar.tdefs.items():
+        syms[Symbol.nonterm(tok.text)] = Symbol.nonterm(tok.text, typ.text)
+    cells = {Cell(c.src, syms.get(c.sym, c.sym), c.dst) for c in table.cells}
+    bound = Table(table.start, cells, grammar.eval.text)
+    return bound.freeze() if table.is_frozen else bound
+
+
+def _tabulate_expr(name, tree, algorithm, limits):
+    max_states, max_cells, deadline = limits
+
+    def guard(n_states):
+        if _max_nfa_states < n_states:
+            raise RepetitionTooLarge(name, n_states)
+
+    def check(n_states, n_cells):
+        if max_states is not None and max_states < n_states:
+            raise StateExplosion(name, n_states, 'state')
+        if max_cells is not None and max_cells < n_cells:
+            raise StateExplosion(name, n_states, 'cell')
+        if deadline is not None and deadline < time():
+            raise StateExplosion(name, n_states, 'time')
+
+    nfa = _constructions[algorithm](tree.postfix(), guard)
+    return _to_dfa(*nfa, check=check)
+
+
+# Repetitions are expanded by copying automata, so their bounds multiply
+_max_nfa_states = 1 << 22
+
+
+def _to_nfa(tokens, guard=None):
+    # Thompson's construction. A fragment `lo` owns states lo to n - 1, so
+    # it can be copied by shifting its states.
+    eps = Token.term('')
+    n, stack = 0, []
+    for t in tokens:
+        if t.is_concat:
+            trs_r, ini_r, fin_r, _ = stack.pop()
+            trs_l, ini_l, fin_l, lo = stack.pop()
+            ini, fin = ini_l, fin_r
+            trs = trs_l
+            trs |= trs_r
+            trs.add((fin_l, eps, ini_r))
+            stack.append((trs, ini, fin, lo))
+
+        elif t.is_alter:
+            trs_r, ini_r, fin_r, _ = stack.pop()
+            trs_l, ini_l, fin_l, lo = stack.pop()
+            ini, fin = n, n + 1
+            trs = trs_l
+            trs |= trs_r
+            trs |= {(ini, eps, ini_r), (fin_r, eps, fin),
+                    (ini, eps, ini_l), (fin_l, eps, fin)}
+            stack.append((trs, ini, fin, lo))
+            n += 2
+
+        elif t.is_star:
+            trs, ini, fin, lo = stack.pop()
+            trs |= {(n, eps, ini), (fin, eps, n)}
+            stack.append((trs, n, n, lo))
+            n += 1
+
+        elif t.is_repeat:
+            frag, n = _repeat_nfa(stack.pop(), t.bounds, n, guard)
+            stack.append(frag)
+
+        else:
+            ini, fin = n, n + 1
+            trs = {(n, t, fin)}
+            stack.append((trs, ini, fin, n))
+            n += 2
+
+    trs, ini, fin, _ = stack.pop()
+    return trs, ini, 1 << fin, n
+
+
+def _repeat_nfa(frag, bounds, n, guard):
+    # X{l,h} is X^l (X | "")^(h-l) for finite h and X^(l-1) X+ otherwise,
+    # as if it were written out. Each optional copy gets new initial and
+    # final states, because the initial state of X can be re-entered (e.g.
+    # by a leading star) and so cannot be skipped from.
+    eps = Token.term('')
+    trs, ini, fin, lo = frag
+    (low, high), w = bounds, n - lo
+    if high == 0:
+        return ({(n, eps, n + 1)}, n, n + 1, n), n + 2
+    if low == 0 and high == float('inf'):
+        trs |= {(n, eps, ini), (fin, eps, n)}
+        return (trs, n, n, lo), n + 1
+
+    k = low if high == float('inf') else high
+    opt = 0 if high == float('inf') else high - low
+    if guard:
+        guard(lo + k * w + 2 * opt)
+    base = list(trs)
+    for i in range(1, k):
+        d = i * w
+        trs.update((src + d, tok, dst + d) for src, tok, dst in base)
+    n = lo + k * w
+
+    start = end = None
+    for i in range(k):
+        d = i * w
+        if i < k - opt:
+            s, e = ini + d, fin + d
+        else:
+            s, e = n, n + 1
+            trs |= {(s, eps, ini + d), (s, eps, e), (fin + d, eps, e)}
+            n += 2
+        if end is None:
+            start = s
+        else:
+            trs.add((end, eps, s))
+        end = e
 
+    if high == float('inf'):
+        trs.add((end, eps, ini + (k - 1) * w))
+    return (trs, start, end, lo), n
 
-def _to_dfa(table):
-    eps_cls = _create_eps_closure_func(table)
-    trs, queue, queued = set(), [], set()
-    inis = {eps_cls((c.src,)) for c in table.cells if c.src.is_ini}
 
-    queue.extend(inis)
-    queued.update(inis)
+def _to_pos_nfa(tokens, guard=None):
+    # Glushkov's construction. State 0 is the initial state and state p is
+    # the p-th symbol occurrence, so there are no epsilon transitions. A
+    # fragment `lo` owns positions lo and later.
+    toks, follows, stack = [None], [0], []
+    for t in tokens:
+        if t.is_concat:
+            nul_r, fst_r, lst_r, _ = stack.pop()
+            nul_l, fst_l, lst_l, lo = stack.pop()
+            for p in _members(lst_l):
+                follows[p] |= fst_r
+            fst = fst_l | fst_r if nul_l else fst_l
+            lst = lst_l | lst_r if nul_r else lst_r
+            stack.append((nul_l and nul_r, fst, lst, lo))
+
+        elif t.is_alter:
+            nul_r, fst_r, lst_r, _ = stack.pop()
+            nul_l, fst_l, lst_l, lo = stack.pop()
+            stack.append((nul_l or nul_r, fst_l | fst_r, lst_l | lst_r, lo))
+
+        elif t.is_star:
+            nul, fst, lst, lo = stack.pop()
+            for p in _members(lst):
+                follows[p] |= fst
+            stack.append((True, fst, lst, lo))
+
+        elif t.is_repeat:
+            frag = stack.pop()
+            stack.append(_repeat_pos(frag, t.bounds, toks, follows, guard))
+
+        elif t.text == '':
+            stack.append((True, 0, 0, len(toks)))
+
+        else:
+            p = len(toks)
+            toks.append(t)
+            follows.append(0)
+            stack.append((False, 1 << p, 1 << p, p))
+
+    nul, fst, lst, _ = stack.pop()
+    follows[0] = fst
+    trs = set()
+    for p, follow in enumerate(follows):
+        trs.update((p, toks[q], q) for q in _members(follow))
+    return trs, 0, lst | nul, len(toks)
+
+
+def _repeat_pos(frag, bounds, toks, follows, guard):
+    # Same shape as `_repeat_nfa`. The copies are concatenated from left to
+    # right, and the copies from the l-th on are nullable.
+    nul, fst, lst, lo = frag
+    (low, high), w = bounds, len(toks) - lo
+    if high == 0:
+        return True, 0, 0, len(toks)
+    if low == 0 and high == float('inf'):
+        for p in _members(lst):
+            follows[p] |= fst
+        return True, fst, lst, lo
+
+    k = low if high == float('inf') else high
+    opt = 0 if high == float('inf') else high - low
+    if guard:
+        guard(lo + k * w)
+    for i in range(1, k):
+        for p in range(lo, lo + w):
+            toks.append(toks[p])
+            follows.append(follows[p] << i * w)
+
+    if high == float('inf'):
+        d = (k - 1) * w
+        for p in _members(lst << d):
+            follows[p] |= fst << d
+
+    r_nul, r_fst, r_lst = True, 0, 0
+    for i in range(k):
+        d = i * w
+        c_nul, c_fst, c_lst = nul or k - opt <= i, fst << d, lst << d
+        for p in _members(r_lst):
+            follows[p] |= c_fst
+        r_fst = r_fst | c_fst if r_nul else r_fst
+        r_lst = r_lst | c_lst if c_nul else c_lst
+        r_nul = r_nul and c_nul
+    return r_nul, r_fst, r_lst, lo
+
+
+_constructions = {'thompson': _to_nfa, 'glushkov': _to_pos_nfa}
+
+
+def _to_dfa(trs, ini, fins, n, check=None):
+    # NFA states are numbered 0 to n - 1 and sets of them are int bitsets
+    eps_cls = _create_eps_closure_func(trs, n)
+    index = [[] for _ in range(n)]
+    for src, tok, dst in trs:
+        if tok.text != '':
+            index[src].append((tok, dst))
+
+    trs, queue = set(), deque()
+    inis = eps_cls(1 << ini)
+
+    queue.append(inis)
+    queued = {inis}
     while queue:
-        srcs, queue = queue[0], queue[1:]
+        srcs = queue.popleft()
         edges = {}
-        for c in table.cells:
-            if c.src in srcs:
-                edges.setdefault(c.sym, set()).add(c.dst[0])
-        for sym, dsts in edges.items():
-            if sym.text != '':
-                dsts = eps_cls(dsts)
-                trs.add((srcs, sym, dsts))
-                if dsts not in queued:
-                    queue.append(dsts)
-                    queued.add(dsts)
-
-    while True:
-        grps = {}
-        for srcs, sym, dsts in trs:
-            grps.setdefault(srcs, set()).add((sym, dsts))
-
-        pair = None
-        for (s1, g1), (s2, g2) in combinations(grps.items(), 2):
-            if (g1 == g2):
-                if any(s.is_fin for s in s1) is any(s.is_fin for s in s2):
-                    if any(s.is_ini for s in s2):
-                        pair = s2, s1
-                    else:
-                        pair = s1, s2
-                    break
-        else:
-            break
-
-        trs = {t for t in trs if t[0] != pair[1]}
-        trs = {t[:2] + (pair[0] if t[2] == pair[1] else t[2],) for t in trs}
-
-    nums, states = {}, {}
-    visited, deq = set(), deque()
-    graph = DiGraph((srcs, dsts, {'label': sym}) for srcs, sym, dsts in trs)
-    for srcs, _, _ in trs:
-        if srcs in inis:
-            states[srcs] = 0
-            deq.append((srcs, _sorted_edge_iter(graph, srcs)))
-            visited.add(srcs)
-
-    while deq:
-        parent, children = deq[0]
-        try:
-            child = next(children)
-            if child not in visited:
-                if child not in states:
-                    sym = next(iter(child)).sym
-                    nums.setdefault(sym, 1)
-                    states[child] = nums[sym]
-                    nums[sym] += 1
-                visited.add(child)
-                deq.append((child, _sorted_edge_iter(graph, child)))
-        except StopIteration:
-            deq.popleft()
+        for src in _members(srcs):
+            for tok, dst in index[src]:
+                edges[tok] = edges.get(tok, 0) | 1 << dst
+        for tok, dsts in edges.items():
+            dsts = eps_cls(dsts)
+            trs.add((srcs, tok, dsts))
+            if dsts not in queued:
+                queue.append(dsts)
+                queued.add(dsts)
+        if check:
+            check(len(queued), len(trs))
 
-    cells = set()
-    for t in trs:
-        if t[0] not in states:
-            continue
+    blocks = _minimize(trs, fins)
+    trs = {(blocks[srcs], tok, blocks[dsts]) for srcs, tok, dsts in trs}
+
+    succs = {}
+    for src, tok, dst in trs:
+        succs.setdefault(src, []).append((tok, dst))
+
+    if inis not in blocks:
+        return set(), set()
+
+    states = {blocks[inis]: 0}
+    queue = deque(states)
+    while queue:
+        src = queue.popleft()
+        for _, dst in sorted(succs.get(src, ())):
+            if dst not in states:
+                states[dst] = len(states)
+                queue.append(dst)
+
+    trs = {(states[src], tok, states[dst]) for src, tok, dst in trs}
+    fins = {states[b] for ss, b in blocks.items() if ss & fins}
+    return trs, fins
+
+
+def _minimize(trs, fins):
+    # Hopcroft's partition refinement. Missing transitions lead to an implicit
+    # dead state, which never needs to be used as a splitter.
+    ids, pres = {}, []
+    for srcs, tok, dsts in trs:
+        for ss in (srcs, dsts):
+            if ss not in ids:
+                ids[ss] = len(ids)
+                pres.append({})
+        pres[ids[dsts]].setdefault(tok, []).append(ids[srcs])
+
+    # Initial partition: final and non-final states
+    keys = {}
+    for ss, i in ids.items():
+        keys.setdefault(bool(ss & fins), set()).add(i)
+    parts = list(keys.values())
+    owner = [None] * len(ids)
+    for b, part in enumerate(parts):
+        for i in part:
+            owner[i] = b
 
-        sym = next(iter(t[0])).sym
+    works = set(range(len(parts)))
+    while works:
+        splitter = parts[works.pop()]
+        xs = {}
+        for i in splitter:
+            for tok, srcs in pres[i].items():
+                xs.setdefault(tok, set()).update(srcs)
 
-        idx = states[t[0]]
-        is_ini = any(s.is_ini for s in t[0])
-        is_fin = any(s.is_fin for s in t[0])
-        src = State(sym, idx, is_ini, is_fin)
+        for x in xs.values():
+            hits = {}
+            for i in x:
+                hits.setdefault(owner[i], set()).add(i)
+            for b, hit in hits.items():
+                if len(hit) == len(parts[b]):
+                    continue
+                parts[b] -= hit
+                parts.append(hit)
+                n = len(parts) - 1
+                for i in hit:
+                    owner[i] = n
+                if b in works or len(hit) <= len(parts[b]):
+                    works.add(n)
+                else:
+                    works.add(b)
 
-        idx = states[t[2]]
-        is_ini = any(s.is_ini for s in t[2])
-        is_fin = any(s.is_fin for s in t[2])
-        dst = State(sym, idx, is_ini, is_fin)
+    return {ss: owner[i] for ss, i in ids.items()}
 
-        c = Cell(src, t[1], (dst,))
-        cells.add(c)
 
-    table = Table(table.start, cells, table.eval)
-    return table
+def _members(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
 
 
-def _sorted_edge_iter(g, src):
-    edges = g.edges(src, data=True)
-    edges = ((attrs['label'], dsts) for _, dsts, attrs in edges)
-    for e in sorted(edges):
-        yield e[1]
+def _create_eps_closure_func(trs, n):
+    graph = DiGraph((src, dst) for src, tok, dst in trs if tok.text == '')
 
+    # SCCs come out in reverse topological order, so the closures of all
+    # successor components are complete when a component is reached
+    cs = [1 << s for s in range(n)]
+    for scc in sccs(graph):
+        c = 0
+        for s in scc:
+            c |= 1 << s
+            for d in graph.successors(s):
+                c |= cs[d]
+        for s in scc:
+            cs[s] = c
 
-def _create_eps_closure_func(table):
-    edges = {(c.src, c.sym.text, c.dst[0]) for c in table.cells}
-    graph = DiGraph((src, dst) for src, sym, dst in edges if sym == '')
-    states = set(sum(((src, dst) for src, _, dst in edges), ()))
+    memo = {}
 
-    cs = {s: descendants(graph, s) if s in graph else set() for s in states}
-    return lambda ss: frozenset(set(ss).union(*(cs[s] for s in ss)))
+    def eps_cls(bits):
+        c = memo.get(bits)
+        if c is None:
+            c = 0
+            for s in _members(bits):
+                c |= cs[s]
+            memo[bits] = c
+        return c
+    return eps_cls
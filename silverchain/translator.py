@@ -3,7 +3,54 @@ from . import core, encoders, parser, tabulator
 from .data import Symbol
 
 
-def translate(text, lang):
+def translate(text, lang, jobs=1, algorithm='thompson', cache=None,
+              **limits):
+    # For a list of languages, returns the files of each language. Types are
+    # bound after tabulation, so the other stages run only once.
+    if isinstance(lang, str):
+        return translate(text, [lang], jobs, algorithm, cache, **limits)[lang]
+
+    files = {}
+    iters = iter_translate(text, lang, jobs, algorithm, cache, **limits)
+    for name, lang_files in iters.items():
+        files[name] = {n: ''.join(chunks) for n, chunks in lang_files}
+    return files
+
+
+def iter_translate(text, lang, jobs=1, algorithm='thompson', cache=None,
+                   **limits):
+    # Like `translate`, but the files of each language are yielded as their
+    # names and chunks when they are rendered. Tabulation is not lazy, so
+    # errors are raised here.
+    if isinstance(lang, str):
+        return iter_translate(
+            text, [lang], jobs, algorithm, cache, **limits)[lang]
+
+    # Languages found in the cache are not translated. Cache entries of the
+    # others are written while their files are consumed.
+    files, keys = {}, {}
+    if cache is not None:
+        for name in lang:
+            keys[name] = cache.key(text, name, algorithm)
+            hit = cache.get(keys[name])
+            if hit is not None:
+                files[name] = ((n, (c,)) for n, c in hit.items())
+
+    missing = [name for name in lang if name not in files]
+    if missing:
+        tables = tabulate(text, missing, jobs, algorithm, **limits)
+        for name, table in tables.items():
+            files[name] = encoders.get_iterencode_func(name)(table)
+            if cache is not None:
+                files[name] = cache.put_iter(keys[name], files[name])
+    return files
+
+
+def tabulate(text, lang, jobs=1, algorithm='thompson', **limits):
+    # Returns the table that `translate` would encode, for each language
+    if isinstance(lang, str):
+        return tabulate(text, [lang], jobs, algorithm, **limits)[lang]
+
     grammar = parser.parse(text, lang)
 
     unexpanded = core.post_parse(grammar)
@@ -11,8 +58,90 @@ def translate(text, lang):
 
     grammar.validate()
 
-    table = tabulator.tabulate(grammar)
+    table = tabulator.tabulate(grammar, jobs, algorithm, **limits)
     core.post_tabulate(table, unexpanded)
+    table.freeze()
+
+    tables = {}
+    for name in grammar.langs:
+        tables[name] = tabulator.bind(table, grammar.bind(name))
+    return tables
+
+
+class IncrementalTranslator(object):
+    def __init__(self, lang, jobs=1, algorithm='thompson', **limits):
+        self._lang = lang
+        self._jobs = jobs
+        self._algorithm = algorithm
+        self._limits = limits
+        self._text = None
+        self._dfas = {}
+        self._table = None
+        self._sigs = {}
+        self._files = {}
+
+    @property
+    def files(self):
+        return self._files
+
+    def translate(self, text):
+        # Returns the files that differ from the previous call. Files that
+        # are no longer generated are mapped to None.
+        if text == self._text:
+            return {}
+
+        grammar = parser.parse(text, self._lang)
+
+        unexpanded = core.post_parse(grammar)
+        unexpanded = {Symbol.nonterm(t.text) for t in unexpanded}
+
+        grammar.validate()
+
+        # Only expanded expressions that are not cached are tabulated
+        table = tabulator.tabulate(
+            grammar, self._jobs, self._algorithm, self._dfas, **self._limits)
+        keys = {(self._algorithm, e.tree) for e in grammar.prods.values()}
+        self._dfas = {k: v for k, v in self._dfas.items() if k in keys}
+        core.post_tabulate(table, unexpanded)
+        table.freeze()
+
+        # Only nonterminals whose signature changed are encoded
+        sigs = _signatures(table)
+        changed = {s for s, sig in sigs.items() if self._sigs.get(s) != sig}
+        removed = set(self._sigs) - set(sigs)
+
+        encode_func = encoders.get_encode_func(self._lang)
+        files = encode_func(table, changed)
+        if removed:
+            for name in encode_func(self._table, removed):
+                files.setdefault(name, None)
+
+        diff = {}
+        for name, content in files.items():
+            if self._files.get(name) != content:
+                diff[name] = content
+            if content is None:
+                self._files.pop(name, None)
+            else:
+                self._files[name] = content
+
+        self._text = text
+        self._table = table
+        self._sigs = sigs
+        return diff
+
 
-    encode_func = encoders.get_encode_func(lang)
-    return encode_func(table)
+def _signatures(table):
+    # A nonterminal's output depends on its own cells, on the symbols
+    # accepted by the states its cells lead to and on the ids of the states
+    # its cells push
+    outs, ids = table.by_src, table.returns
+    sigs = {}
+    for sym, cells in table.groups.items():
+        dsts = {d for c in cells for d in c.dst}
+        deps = frozenset((d, frozenset(c.sym for c in outs.get(d, ())))
+                         for d in dsts)
+        eval = table.eval if sym == table.start else None
+        rets = frozenset((d, ids[d]) for c in cells for d in c.dst[1:])
+        sigs[sym] = table.start, eval, frozenset(cells), deps, rets
+    return sigs
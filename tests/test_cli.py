@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from silverchain.cli import main
+
+
+def test_write_files(monkeypatch, tmpdir):
+    grammar = tmpdir.join('idoc.txt')
+    grammar.write("""
+    START = idoc ;
+    idoc -> list* ;
+    list -> "begin" item+ "end" ;
+    item -> text list? ;
+    text@java : "String" ;
+    """)
+    outdir = tmpdir.mkdir('out')
+    outdir.join('Stale.java').write('class Stale {}')
+    outdir.join('notes.txt').write('notes')
+    argv = ['silverchain', 'java', '-i', str(grammar), '-o', str(outdir),
+            '--no-cache']
+
+    # Stale files are deleted only if asked, and only generated kinds
+    monkeypatch.setattr(sys, 'argv', argv)
+    main()
+    assert outdir.join('Stale.java').check()
+    monkeypatch.setattr(sys, 'argv', argv + ['--delete-stale'])
+    main()
+    assert not outdir.join('Stale.java').check()
+    assert outdir.join('notes.txt').read() == 'notes'
+
+    # Unchanged files are left as they are, and changed ones are replaced
+    idoc, item = outdir.join('Idoc.java'), outdir.join('Item.java')
+    content = item.read()
+    item.write('class Item {}')
+    os.utime(str(idoc), (1, 1))
+    os.utime(str(item), (1, 1))
+    main()
+    assert idoc.mtime() == 1
+    assert item.mtime() != 1
+    assert item.read() == content
+    assert not [n for n in os.listdir(str(outdir)) if n.endswith('.tmp')]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from silverchain.core import post_tabulate
+from silverchain.data import Cell, State, Symbol, Table
+
+
+def test_post_tabulate():
+    s, a, b = (Symbol.nonterm(t) for t in 'SAB')
+    x = Symbol.term('x')
+    s0, s1 = State(s, 0, True), State(s, 1, False, True)
+    a0, a1 = State(a, 0, True), State(a, 1, False, True)
+    b0, b1 = State(b, 0, True), State(b, 1, False, True)
+    cells = {Cell(s0, a, (s1,)), Cell(a0, b, (a1,)), Cell(b0, x, (b1,))}
+    table = Table(s, cells, 'eval')
+    post_tabulate(table, {a, b})
+
+    # `A` starts with `B`, which is copied too
+    assert Cell(s0, b, (s1,)) in table.cells
+    assert Cell(s0, x, (s1,)) in table.cells
+    assert Cell(a0, x, (a1,)) in table.cells
+    assert len(table.cells) == 9
+
+
+def test_post_tabulate_recursion():
+    # `A` and `B` start with each other, and `L` starts with itself. Each
+    # production is a chain of three states, so that the copied cells lead
+    # to a state and the added cells push it.
+    s, x, a, b, lr = (Symbol.nonterm(t) for t in ('S', 'X', 'A', 'B', 'L'))
+    y = Symbol.term('y')
+    cells = set()
+    for src, sym in ((s, x), (x, a), (a, b), (b, a), (lr, lr)):
+        s0, s1 = State(src, 0, True), State(src, 1)
+        s2 = State(src, 2, False, True)
+        cells.add(Cell(s0, sym, (s1,)))
+        cells.add(Cell(s1, y, (s2,)))
+    table = Table(s, cells, 'eval')
+    post_tabulate(table, {x, a, b, lr})
+
+    # The cycles are cut, and each way to start with a symbol is kept
+    s0, s1 = State(s, 0, True), State(s, 1)
+    x1, a1, b1 = (State(Symbol.nonterm(t), 1) for t in ('_X', '_A', '_B'))
+    assert {c for c in table.cells if c.src == s0} == {
+        Cell(s0, x, (s1,)),
+        Cell(s0, a, (x1, s1)),
+        Cell(s0, a, (b1, a1, x1, s1)),
+        Cell(s0, b, (a1, x1, s1)),
+    }
+    assert len(table.cells) == 27
+
+
+def test_post_tabulate_shared_first():
+    # `A` and `B` both start with `x`, so `S` gets a cell for each of them
+    s, a, b = (Symbol.nonterm(t) for t in 'SAB')
+    x, y, z = (Symbol.term(t) for t in 'xyz')
+    s0, s1 = State(s, 0, True), State(s, 1, False, True)
+    cells = {Cell(s0, a, (s1,)), Cell(s0, b, (s1,))}
+    for src, sym in ((a, y), (b, z)):
+        p0, p1 = State(src, 0, True), State(src, 1)
+        cells.add(Cell(p0, x, (p1,)))
+        cells.add(Cell(p1, sym, (State(src, 2, False, True),)))
+    table = Table(s, cells, 'eval')
+    post_tabulate(table, {a, b})
+
+    _a0, _a1 = State(Symbol.nonterm('_A'), 0), State(Symbol.nonterm('_A'), 1)
+    _b0, _b1 = State(Symbol.nonterm('_B'), 0), State(Symbol.nonterm('_B'), 1)
+    assert table.cells - cells == {
+        Cell(_a0, x, (_a1,)),
+        Cell(_a1, y, ()),
+        Cell(_b0, x, (_b1,)),
+        Cell(_b1, z, ()),
+        Cell(s0, x, (_a1, s1)),
+        Cell(s0, x, (_b1, s1)),
+    }
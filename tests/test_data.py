@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import pickle
+import pytest
+from silverchain.core import post_parse
+from silverchain.data import CompactTable, Expr, Node, Symbol, Token
+from silverchain.data import Cell, State, Table
+from silverchain.errors import FrozenTable, InvalidTableFile
+from silverchain.parser import parse
+from silverchain.tabulator import bind, tabulate
+
+
+def test_compact_table():
+    text = """
+    START = idoc ;
+    idoc -> list* ;
+    list -> "begin" item+ "end" ;
+    item -> text list? ;
+    text@java : "String" ;
+    EVAL@java = "Eval.evaluate(context);" ;
+    """
+    table = tabulate(parse(text, 'java'))
+    compact = CompactTable.from_table(table)
+    assert len(compact) == len(table.cells)
+    assert str(compact.to_table()) == str(table)
+
+    for c in table.cells:
+        src = compact.state_id(c.src)
+        sym = compact.symbol_id(c.sym)
+        dst = tuple(compact.state_id(d) for d in c.dst)
+        assert compact.next(src, sym) == dst
+
+    src = compact.state_id(next(iter(table.cells)).src)
+    sym = compact.symbol_id(Symbol.term('begin'))
+    srcs = [src] + [compact.state_id(c.src) for c in table.cells]
+    syms = [sym] + [compact.symbol_id(c.sym) for c in table.cells]
+    found = [compact.find(s, y) for s, y in zip(srcs, syms)]
+    assert list(compact.find_all(srcs, syms)) == found
+
+
+def test_compact_table_file(tmpdir):
+    text = """
+    START = idoc ;
+    idoc -> list* ;
+    list -> "begin" item+ "end" ;
+    item -> text list? ;
+    text@java : "String" ;
+    EVAL@java = "Eval.evaluate(context);" ;
+    """
+    table = bind(tabulate(parse(text, ['java'])), parse(text, 'java'))
+    compact = CompactTable.from_table(table)
+    path = str(tmpdir.join('idoc.sctb'))
+    with open(path, 'wb') as f:
+        compact.save(f)
+
+    loaded = CompactTable.load(path)
+    assert str(loaded.to_table()) == str(table)
+    assert loaded.symbols == compact.symbols
+    assert loaded.states == compact.states
+    for i in range(len(compact)):
+        assert loaded.cell(i) == compact.cell(i)
+
+    with open(path, 'r+b') as f:
+        f.truncate(100)
+    with pytest.raises(InvalidTableFile):
+        CompactTable.load(path)
+
+
+def test_expr_tree():
+    a, b = Token.term('a'), Token.nonterm('b')
+    tokens = [a, b, Token.star(), Token.concat()]
+    expr = Expr(tokens)
+    assert expr.tree is Node.from_postfix(tokens)
+    assert list(expr.tree.postfix()) == tokens
+    assert pickle.loads(pickle.dumps(expr.tree)) is expr.tree
+
+    # Inlined bodies are shared, not copied
+    text = """
+    START = s ;
+    s -> a a a a ;
+    a -> b b b b ;
+    b -> c c c c ;
+    c -> "x" "y" ;
+    """
+    grammar = parse(text, 'java')
+    post_parse(grammar)
+    tree = grammar.prods[Token.nonterm('s')].tree
+    assert len(tree.dag()) < 30 < 200 < tree.size
+    assert len(Expr.from_tree(tree)) == tree.size
+
+
+def test_interning():
+    assert Token.term('a') is Token.term('a')
+    assert Symbol.nonterm('A', 'int') is Symbol.nonterm('A', 'int')
+    assert Symbol.nonterm('A') != Symbol.nonterm('A', 'int')
+    sym = pickle.loads(pickle.dumps(Symbol.term('a')))
+    assert sym is Symbol.term('a')
+
+    a = Symbol.nonterm('A')
+    s1, s2 = State(a, 1, False, True), State(a, 2)
+    assert hash(s1) != hash(s2)
+    c1, c2 = Cell(s1, a, (s2,)), Cell(s2, a, (s1,))
+    assert hash(c1) != hash(c2)
+    assert pickle.loads(pickle.dumps(c1)) == c1
+
+
+def test_table_indexes():
+    a, b = Symbol.nonterm('A'), Symbol.term('b')
+    s0, s1 = State(a, 0), State(a, 1, True)
+    c1 = Cell(s0, b, (s1,))
+    table = Table(a, {c1}, '')
+    assert table.by_src == {s0: {c1}}
+    assert table.states == {s0, s1}
+
+    c2 = Cell(s1, b, (s0,))
+    table.add(c2)
+    assert table.by_src_sym[(s1, b)] == {c2}
+    assert table.by_sym == {b: {c1, c2}}
+    assert table.groups == {a: {c1, c2}}
+
+    table.discard(c1)
+    assert table.cells == {c2}
+
+    table.freeze()
+    assert table.groups is table.groups
+    with pytest.raises(FrozenTable):
+        table.add(c1)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from silverchain.graph import DiGraph
+from silverchain.graph import bfs_edges, descendants, on_cycle
+from silverchain.graph import strongly_connected_components as sccs
+
+
+def test_graph():
+    g = DiGraph([(1, 2), (2, 3), (3, 2), (3, 4), (5, 5)])
+    assert list(bfs_edges(g, 1)) == [(1, 2), (2, 3), (3, 4)]
+    assert descendants(g, 1) == {2, 3, 4}
+    assert list(sccs(g)) == [{4}, {2, 3}, {1}, {5}]
+    assert [n for n in g.nodes() if on_cycle(g, n)] == [2, 3, 5]
+
+    v = g.view(node_filter=lambda n: n != 3)
+    assert descendants(v, 1) == {2}
+    assert not on_cycle(v, 2)
+    assert sorted(map(sorted, sccs(v))) == [[1], [2], [4], [5]]
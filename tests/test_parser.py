@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import glob
+import os
 import pytest
 from silverchain.errors import *
 from silverchain.parser import parse
@@ -111,3 +113,43 @@ def test_parse_err_9():
     expr = next(iter(grammar.prods.values()))
     expr._tokens.pop()
     pytest.raises(InvalidExpression, grammar.validate)
+
+
+def test_parse_err_10():
+    text = """
+    START = A ;
+    A -> "x" ( "y" ;
+    """
+    pytest.raises(InvalidSyntax, parse, text, 'java')
+
+
+def test_parse_pyparsing():
+    pytest.importorskip('pyparsing')
+    from silverchain._pyparser import parse as parse_ref
+
+    texts = []
+    examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+    for path in sorted(glob.glob(os.path.join(examples, '*.txt'))):
+        with open(path) as f:
+            texts.append(f.read())
+    texts.append("""
+    START = A ;  # comment
+    A -> ( "a" B{2,} | "b"{0} ) "c"{1,3} | B ;
+    A -> B? ;
+    B@java : "Map<String, Integer>" ;
+    C : "int" ;
+    EVAL@java = "Eval.evaluate(\\"\\t\\");" ;
+    """)
+    for text in texts:
+        grammar, ref = parse(text, 'java'), parse_ref(text, 'java')
+        assert grammar.start == ref.start
+        assert grammar.eval == ref.eval
+        assert grammar.tdefs == ref.tdefs
+        assert list(grammar.prods) == list(ref.prods)
+        for lhs, rhs in grammar.prods.items():
+            assert list(rhs) == list(ref.prods[lhs])
+
+    for text in ('START = A ; A -> "a"{2,1} ;', 'START = A ; A -> "a" |'):
+        with pytest.raises(Exception) as e:
+            parse(text, 'java')
+        pytest.raises(e.type, parse_ref, text, 'java')
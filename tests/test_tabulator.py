@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
+import pytest
 from textwrap import dedent
+from silverchain.errors import RepetitionTooLarge, StateExplosion
 from silverchain.parser import parse
-from silverchain.tabulator import tabulate as _tabulate
+from silverchain.tabulator import bind, tabulate as _tabulate
 
 
 def tabulate(text):
@@ -27,8 +29,98 @@ def test_tabulate_1():
     item[1]*  -list->  item[2]*
     list[0]  -"begin"->  list[1]
     list[1]  -item->  list[2]
-    list[2]  -item->  list[2]
     list[2]  -"end"->  list[3]*
+    list[2]  -item->  list[2]
+    """)
+
+    assert str(tabulate(text)).strip() == tablestr.strip()
+
+
+def test_tabulate_2():
+    text = """
+    START = A ;
+    A -> "a" "b" | "c" "b" ;
+    """
+
+    tablestr = dedent("""
+    START = A
+    EVAL = ""
+    A[0]  -"a"->  A[1]
+    A[0]  -"c"->  A[1]
+    A[1]  -"b"->  A[2]*
     """)
 
     assert str(tabulate(text)).strip() == tablestr.strip()
+
+
+def test_tabulate_jobs():
+    text = """
+    START = idoc ;
+    idoc -> list* ;
+    list -> "begin" item+ "end" ;
+    item -> text list? ;
+    text@java : "String" ;
+    EVAL@java = "Eval.evaluate(context);" ;
+    """
+    grammar = parse(text, 'java')
+    assert str(_tabulate(grammar, 2)) == str(_tabulate(grammar))
+
+
+def test_tabulate_glushkov():
+    text = """
+    START = A ;
+    A -> ("a" | B "b"{0,2})* "c"? (B | "a" "d"+) ;
+    B -> ("b" "c"* | "d"{2,3})+ A? ;
+    """
+    grammar = parse(text, 'java')
+    table1 = _tabulate(grammar)
+    table2 = _tabulate(grammar, algorithm='glushkov')
+    assert table1.cells == table2.cells
+
+
+def test_tabulate_limits():
+    text = """
+    START = A ;
+    A -> ("a" | "b")* "a" ("a" | "b"){8} ;
+    """
+    grammar = parse(text, 'java')
+    assert len(_tabulate(grammar).states) == 2 ** 9
+
+    for jobs in (1, 2):
+        with pytest.raises(StateExplosion) as e:
+            _tabulate(grammar, jobs, max_states=100)
+        assert str(e.value).startswith('Tabulating A exceeded the state')
+    pytest.raises(StateExplosion, _tabulate, grammar, max_cells=100)
+    pytest.raises(StateExplosion, _tabulate, grammar, timeout=0)
+
+
+def test_tabulate_repeat():
+    texts = [
+        'START = A ; A -> ("a" "b"*){2,4} ("a"* "c"){0,2} "d"{1,} ;',
+        'START = A ; A -> "a" "b"* "a" "b"* ("a" "b"* ("a" "b"*)?)?'
+        '                 (("a"* "c") ("a"* "c")?)? "d" "d"* ;'
+    ]
+    for algorithm in ('thompson', 'glushkov'):
+        tables = [_tabulate(parse(t, 'java'), algorithm=algorithm)
+                  for t in texts]
+        assert str(tables[0]) == str(tables[1])
+
+    text = 'START = A ; A -> ("a"{1000}){10000} ;'
+    pytest.raises(RepetitionTooLarge, tabulate, text)
+
+
+def test_tabulate_bind():
+    text = """
+    START = list ;
+    list -> "begin" (text | num)* "end" ;
+    text@java : "String" ;
+    num : "int" ;
+    EVAL@java = "Eval.evaluate(context);" ;
+    """
+    grammar = parse(text, ['java'])
+    assert grammar.langs == ['java']
+    assert all(t is None for t in grammar.tdefs.values())
+
+    table = bind(_tabulate(grammar), grammar.bind('java'))
+    assert str(table) == str(_tabulate(parse(text, 'java')))
+    assert table.eval == 'Eval.evaluate(context);'
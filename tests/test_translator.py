@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
-from silverchain.translator import translate
+import os
+import pytest
+from silverchain.cache import TranslationCache
+from silverchain.encoders.java_data import NontermClass
+from silverchain.encoders.java_encoder import iterencode
+from silverchain.translator import iter_translate, tabulate, translate
+from silverchain.translator import IncrementalTranslator
 
 
 def test_translate():
@@ -11,4 +17,94 @@ def test_translate():
     text@java : "String" ;
     EVAL@java = "Eval.evaluate(context);" ;
     """
-    translate(text, 'java')
+    files = translate(text, 'java')
+    assert translate(text, ['java']) == {'java': files}
+
+    chunks = iterencode(tabulate(text, 'java'))
+    assert {name: ''.join(c) for name, c in chunks} == files
+
+
+def test_translate_returns():
+    text = """
+    START = block ;
+    block -> "begin" stmt* "end" ;
+    stmt -> "do" | block ;
+    """
+    files = translate(text, 'java')
+    code = ''.join(files.values())
+    assert 'getDeclaredConstructor' not in code
+
+    # Each pushed state is instantiated by the factory under its id
+    table = tabulate(text, 'java')
+    assert table.returns
+    for st, i in table.returns.items():
+        name = NontermClass.to_class_name(st.sym.text)
+        case = 'case {}:\n{}return new {}.State{}<>(context);'.format(
+            i, ' ' * 16, name, st.idx)
+        assert case in files['Return$.java']
+        assert 'context.push({});'.format(i) in code
+    assert 'Return$.create(context.pop(), context)' in code
+
+
+def test_incremental_translate():
+    text1 = """
+    START = idoc ;
+    idoc -> list* ;
+    list -> "begin" item+ "end" ;
+    item -> text list? ;
+    text@java : "String" ;
+    EVAL@java = "Eval.evaluate(context);" ;
+    """
+    text2 = text1.replace('Eval.evaluate', 'Eval.run')
+    text3 = """
+    START = idoc ;
+    idoc -> "empty" ;
+    """
+
+    translator = IncrementalTranslator('java')
+    assert translator.translate(text1) == translate(text1, 'java')
+    assert translator.translate(text1) == {}
+
+    files = translator.translate(text2)
+    assert set(files) == {'Idoc.java'}
+    assert translator.files == translate(text2, 'java')
+
+    files = translator.translate(text3)
+    assert files['List.java'] is None and files['Item.java'] is None
+    assert translator.files == translate(text3, 'java')
+
+
+def test_translate_cache(tmpdir):
+    text = """
+    START = idoc ;
+    idoc -> list* ;
+    list -> "begin" item+ "end" ;
+    item -> text list? ;
+    text@java : "String" ;
+    """
+    cache = TranslationCache(str(tmpdir))
+    key = cache.key(text, 'java', 'thompson')
+
+    # An entry is stored only when all of its files are consumed
+    chunks = iter_translate(text, 'java', cache=cache)
+    next(chunks)
+    chunks.close()
+    assert cache.get(key) is None
+    assert not [n for n in os.listdir(str(tmpdir)) if n.endswith('.tmp')]
+
+    files = translate(text, 'java', cache=cache)
+    assert cache.get(key) == files
+    assert translate(text, ['java'], cache=cache) == {'java': files}
+
+    # Whitespace and comments do not change the key
+    text2 = '# idoc\n' + ' '.join(text.split())
+    assert cache.key(text2, 'java', 'thompson') == key
+    assert cache.key(text2, 'java', 'glushkov') != key
+    with pytest.raises(ValueError):
+        cache.key(text2, 'java', 'position')
+
+    # Least recently used entries are evicted
+    cache = TranslationCache(str(tmpdir), max_size=0)
+    cache.put('other', files)
+    assert cache.get('other') is None
+    assert cache.get(key) is None